@@ -17,8 +17,45 @@ define(['d3'], function(d3) {
         return selected ? "stroke-width: 2px; stroke: #00f" : "stroke-width: 1.5px";
     }
 
+    // turn the columnar data produced by d3.graph_data into lists of objects
+    function expandGraph(graph) {
+        if (Array.isArray(graph.nodes)) return graph;
+        var gn = graph.nodes, gl = graph.links, ga = graph.arcs;
+        var nodes = [], links = [], arcs = [];
+        var i;
+
+        for (i = 0; i < gn.name.length; i++) {
+            nodes.push({name: String(gn.name[i]), x: gn.x[i], y: gn.y[i], t: gn.t[i],
+                        n: gn.n ? gn.n[i] : 1});
+        }
+
+        for (i = 0; i < gl.source.length; i++) {
+            var s = gn.name[gl.source[i]], t = gn.name[gl.target[i]];
+            links.push({id: String(i),
+                        label: graph.labels[gl.label[i]],
+                        source: String(s),
+                        target: String(t),
+                        edge_index: gl.edge_index[i],
+                        num_edge_siblings: gl.num_edge_siblings[i],
+                        flip_orientation: s > t});
+        }
+
+        for (i = 0; i < ga.at_v.length; i++) {
+            arcs.push({links: ga.links[i].map(String),
+                       at_v: String(gn.name[ga.at_v[i]])});
+        }
+
+        return {nodes: nodes, links: links, arcs: arcs};
+    }
+
+    // collapsed nodes grow with the number of vertices they stand for
+    function nodeRadius(d, node_size) {
+        return (d.n > 1) ? node_size * Math.min(3, Math.sqrt(d.n)) : node_size;
+    }
+
     return {
     showGraph: function(graph_id, tag, graph, width, height, scale, node_size, show_labels) {
+        graph = expandGraph(graph);
         var ntab = {};
         var etab = {};
 
@@ -101,36 +138,27 @@ define(['d3'], function(d3) {
             return s;
         }
 
+        // one path through all the edges of an arc, 15 units from the vertex
         function arc_data(d) {
-            var len1 = 15;
-            var len2 = 15;
             var r = 15;
+            var pts = d.paths.map(function(path, i) {
+                // the arc is at the target end of edges going into at_v
+                var len = (d.ends[i][1] == d.at_v) ? path.getTotalLength() - r : r;
+                return path.getPointAtLength(len);
+            });
 
-            // use the 'end' field to figure out if the arc is at the source
-            // or the target of the first edge
-            if (d.at_v == d.v2) {
-                len1 = d.sourcePath.getTotalLength() - len1;
-            }
-
-            // use the value for 'ctr' to figure out if arc is at the source
-            // or target of second edge.
-            if (d.at_v == d.v4) {
-                len2 = d.targetPath.getTotalLength() - len2;
-            }
-
-            var p1 = d.sourcePath.getPointAtLength(len1);
-            var p2 = d.targetPath.getPointAtLength(len2);
-
-            var s = "M " + p1.x + " " + p1.y;
-            //s += " L " + p2.x + " " + p2.y;
+            var s = "M " + pts[0].x + " " + pts[0].y;
+            for (var i = 1; i < pts.length; i++) {
+                var p1 = pts[i-1], p2 = pts[i];
 
-            // figure out whether the acute angle is clockwise or anti-clockwise
-            var a = p2.x * p1.y + d.at_v.x * p2.y + p1.x * d.at_v.y;
-            var b = p1.x * p2.y + p2.x * d.at_v.y + d.at_v.x * p1.y;
-            var bend_right = a < b;
+                // figure out whether the acute angle is clockwise or anti-clockwise
+                var a = p2.x * p1.y + d.at_v.x * p2.y + p1.x * d.at_v.y;
+                var b = p1.x * p2.y + p2.x * d.at_v.y + d.at_v.x * p1.y;
+                var bend_right = a < b;
 
-            var which_arc = bend_right ? "0 1" : "0 0";
-            s += " A " + r + " " + r + " 0 " + which_arc + " " + p2.x + " " + p2.y;
+                var which_arc = bend_right ? "0 1" : "0 0";
+                s += " A " + r + " " + r + " 0 " + which_arc + " " + p2.x + " " + p2.y;
+            }
             return s;
         }
 
@@ -165,12 +193,12 @@ define(['d3'], function(d3) {
             .text(function(d) { return d.label; });
 
         graph.arcs.forEach(function(d) {
-            d.sourcePath = document.getElementById('edge_' + graph_id + '_' + d.source);
-            d.targetPath = document.getElementById('edge_' + graph_id + '_' + d.target);
-            d.v1 = etab[d.source].source;
-            d.v2 = etab[d.source].target;
-            d.v3 = etab[d.target].source;
-            d.v4 = etab[d.target].target;
+            // arcs between a pair of edges, as in older saved graphs
+            if (!d.links) d.links = [d.source, d.target];
+            d.paths = d.links.map(function(l) {
+                return document.getElementById('edge_' + graph_id + '_' + l);
+            });
+            d.ends = d.links.map(function(l) { return [etab[l].source, etab[l].target]; });
             d.at_v = ntab[d.at_v];
         });
 
@@ -196,10 +224,19 @@ define(['d3'], function(d3) {
             });
 
         node.append("circle")
-            .attr("r", node_size)
+            .attr("r", function(d) { return nodeRadius(d, node_size); })
             .attr("fill", function(d) { return nodeColor(d.t); })
             .attr("stroke", "black");
 
+        node.filter(function(d) { return d.n > 1; })
+            .append("text")
+            .attr("y", 0.7 * node_size + 14)
+            .text(function (d) { return d.n; })
+            .attr("text-anchor", "middle")
+            .attr("font-size", "10px")
+            .attr("font-family", "monospace")
+            .attr("fill", "#666");
+
         // node.filter(function(d) { return d.phase != ''; })
         //     .append("text")
         //     .attr("y", 0.7 * node_size + 14)
@@ -252,8 +289,9 @@ define(['d3'], function(d3) {
                 link.filter(function(d) { return d.source.selected || d.target.selected; })
                     .attr("d", path_data);
 
-                arc.filter(function(d) { return d.v1.selected || d.v2.selected ||
-                                                d.v3.selected || d.v4.selected; })
+                arc.filter(function(d) {
+                        return d.ends.some(function(e) { return e[0].selected || e[1].selected; });
+                    })
                    .attr("d", arc_data);
                     
 
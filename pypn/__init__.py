@@ -16,8 +16,23 @@
 
 from .graph import Graph
 from .expr import Var, I
-from .proofnet import prove
-from .d3 import draw
-from . import d3
-from . import variables
+from .proofnet import prove, prove_all, count_proofs, check, check_all, CheckerPipeline
+from .parse import parse, parse_sequent, read_sequents
 from . import proofnet
+from .lemma import LemmaCache
+
+# The drawing code and the predefined variables are only loaded when first
+# used, since finding out how to display graphs means importing IPython.
+_lazy = {'d3': ('d3', None), 'variables': ('variables', None), 'draw': ('d3', 'draw'),
+         'svg': ('svg', None), 'save_svg': ('svg', 'save_svg')}
+
+def __getattr__(name):
+    if name in _lazy:
+        import importlib
+        module, attr = _lazy[name]
+        m = importlib.import_module('.' + module, __name__)
+        return getattr(m, attr) if attr else m
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy))
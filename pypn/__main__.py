@@ -0,0 +1,88 @@
+# HOCC - Python library for higher order causal categories
+# Copyright (C) 2019 - Aleks Kissinger
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Batch prover, run as ``python -m pypn SEQUENTS [-o RESULTS]``.
+
+Reads a file with one sequent per line and proves them in parallel, writing
+one JSON object per line as results come in (see
+:func:`pypn.batch.prove_sequent`, with the line number added as 'line').
+Results are written as soon as they are found, so if the output file already
+exists the sequents recorded in it are skipped, and a run that was killed
+carries on where it stopped.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from . import batch
+from . import proofnet
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog='python -m pypn',
+                                description='Prove a file of sequents, one per line.')
+    p.add_argument('sequents', help="file with one sequent 'A |- B' per line")
+    p.add_argument('-o', '--output', default=None,
+                   help='JSON lines file for the results (default: SEQUENTS.results.jsonl)')
+    p.add_argument('-c', '--checker', default='cut', choices=sorted(proofnet.CHECKERS))
+    p.add_argument('-j', '--jobs', type=int, default=None,
+                   help='number of worker processes (default: number of CPUs)')
+    p.add_argument('--eta', action='store_true', help='try eta-contracted links first')
+    p.add_argument('--no-nets', action='store_true', help='leave the proof nets out of the results')
+    p.add_argument('--restart', action='store_true', help='ignore existing results and start over')
+    p.add_argument('-q', '--quiet', action='store_true', help='no progress output')
+    args = p.parse_args(argv)
+
+    output = args.output or args.sequents + '.results.jsonl'
+    if args.restart and os.path.exists(output): os.remove(output)
+    done = batch.completed_lines(output)
+    tasks = [(n, text, args.checker, args.eta) for n, text in batch.read_tasks(args.sequents)
+             if n not in done]
+    total = len(tasks) + len(done)
+    if done and not args.quiet:
+        print('Resuming: {} of {} sequents already done'.format(len(done), total), file=sys.stderr)
+
+    counts = {'proved': 0, 'unproved': 0, 'error': 0}
+    t = time.time()
+    last = 0
+    with open(output, 'a', encoding='utf-8') as out, \
+         multiprocessing.Pool(args.jobs) as pool:
+        for i, r in enumerate(pool.imap_unordered(batch._prove_task, tasks), 1):
+            if args.no_nets: r.pop('net', None)
+            out.write(json.dumps(r) + '\n')
+            out.flush()
+            if 'error' in r: counts['error'] += 1
+            elif r['proved']: counts['proved'] += 1
+            else: counts['unproved'] += 1
+
+            now = time.time()
+            if not args.quiet and (now - last > 1 or i == len(tasks)):
+                last = now
+                rate = i / (now - t) if now > t else 0
+                left = (len(tasks) - i) / rate if rate else 0
+                print('\r{}/{} done, {} proved, {} unproved, {} errors, {:.1f}/s, {:.0f}s left  '.format(
+                    len(done) + i, total, counts['proved'], counts['unproved'], counts['error'],
+                    rate, left), end='', file=sys.stderr, flush=True)
+    if not args.quiet and tasks: print(file=sys.stderr)
+    return 1 if counts['error'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
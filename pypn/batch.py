@@ -0,0 +1,108 @@
+# HOCC - Python library for higher order causal categories
+# Copyright (C) 2019 - Aleks Kissinger
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Proving sequents given as text, for use in worker processes.
+
+Results are plain dicts that can be sent between processes and written as
+JSON. Proof nets are included in the binary format of :mod:`pypn.serialize`,
+encoded in base64.
+"""
+
+import base64
+import json
+import time
+
+from .parse import parse_sequent
+from . import proofnet
+
+__all__ = ['checker_by_name', 'prove_sequent', 'encode_net', 'decode_net',
+           'read_tasks', 'completed_lines']
+
+
+def checker_by_name(name):
+    """Returns the checker called name in :data:`pypn.proofnet.CHECKERS`."""
+    try:
+        return proofnet.CHECKERS[name]
+    except KeyError:
+        raise ValueError("Unknown checker '{}', expected one of: {}".format(
+            name, ', '.join(sorted(proofnet.CHECKERS))))
+
+
+def encode_net(g):
+    return base64.b64encode(g.to_bytes()).decode('ascii')
+
+
+def decode_net(s):
+    """Returns the graph encoded in a result's 'net' field."""
+    from .graph import Graph
+    return Graph.from_bytes(base64.b64decode(s))
+
+
+def prove_sequent(text, checker='cut', eta=False):
+    """Proves the sequent 'A |- B' given as text. Returns a dict with the keys
+    'sequent', 'proved', 'net' (None if not proved) and 'time' in seconds, or
+    'error' if the sequent can't be parsed or the search fails."""
+    t = time.perf_counter()
+    try:
+        exp0, exp1 = parse_sequent(text)
+        g = proofnet.prove(exp0, exp1, checker_by_name(checker), eta=eta)
+    except Exception as ex:
+        return {'sequent': text, 'error': '{}: {}'.format(type(ex).__name__, ex)}
+    return {'sequent': '{} |- {}'.format(exp0, exp1),
+            'proved': g is not None,
+            'net': None if g is None else encode_net(g),
+            'time': time.perf_counter() - t}
+
+
+def read_tasks(f):
+    """Iterate over the sequents in a file (or a path to a file), yielding pairs
+    (line number, text). Blank lines and lines starting with '#' are skipped."""
+    if isinstance(f, str):
+        with open(f, encoding='utf-8') as f1:
+            yield from read_tasks(f1)
+        return
+    for n, line in enumerate(f, 1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield n, line
+
+
+def completed_lines(path):
+    """Returns the line numbers already recorded in a JSON lines results file. A
+    partly written last record, left by a killed run, is cut off the file."""
+    done = set()
+    try:
+        f = open(path, 'rb+')
+    except FileNotFoundError:
+        return done
+    with f:
+        good = 0
+        for line in f:
+            if not line.endswith(b'\n'): break
+            try:
+                done.add(json.loads(line)['line'])
+            except (ValueError, KeyError, TypeError):
+                break
+            good += len(line)
+        f.truncate(good)
+    return done
+
+
+def _prove_task(task):
+    n, text, checker, eta = task
+    r = prove_sequent(text, checker, eta)
+    r['line'] = n
+    return r
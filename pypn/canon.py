@@ -0,0 +1,224 @@
+# HOCC - Python library for higher order causal categories
+# Copyright (C) 2019 - Aleks Kissinger
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Canonical forms of graphs, for comparing proof nets up to renumbering.
+
+A graph is turned into a coloured graph with one node per vertex, per edge and
+per arc. Vertices are coloured by type (and their place among the inputs and
+outputs), edges by their formula. The colouring is refined until it is stable,
+and remaining ties are broken by individualising nodes one at a time, keeping
+the smallest certificate found. Automorphisms found along the way are used to
+prune branches that can only lead to the same certificate again.
+
+Rows and positions are layout information and are ignored, as is vertex data.
+"""
+
+import hashlib
+
+__all__ = ['canonical_labelling', 'canonical_form', 'canonical_hash',
+           'is_isomorphic', 'NetIndex']
+
+# kinds of nodes and labels of links in the coloured graph
+_VERTEX, _EDGE, _ARC = 0, 1, 2
+_OUT, _IN, _SRC, _TGT, _ARC_E, _ARC_V, _E_ARC, _V_ARC = range(8)
+
+
+def _coloured_graph(g):
+    """Returns (nodes, keys, adj), where nodes are ('v', v), ('e', e) or ('a', i),
+    keys the initial colours and adj the labelled adjacency lists."""
+    vs = list(g.vertices())
+    es = list(g.edges())
+    arcs = g.arc_groups()
+    inputs = {v: i for i, v in enumerate(g.inputs)}
+    outputs = {v: i for i, v in enumerate(g.outputs)}
+
+    nodes = []
+    keys = []
+    vnode = dict()
+    for v in vs:
+        vnode[v] = len(nodes)
+        nodes.append(('v', v))
+        keys.append((_VERTEX, g.type(v), inputs.get(v, -1), outputs.get(v, -1), ''))
+    enode = dict()
+    for e in es:
+        enode[e] = len(nodes)
+        nodes.append(('e', e))
+        d = g.edata(e)
+        keys.append((_EDGE, 0, -1, -1, '' if d is None else str(d)))
+    for i in range(len(arcs)):
+        nodes.append(('a', i))
+        keys.append((_ARC, 0, -1, -1, ''))
+
+    adj = [[] for _ in nodes]
+    for e in es:
+        s, t = g.edge_st(e)
+        x, s, t = enode[e], vnode[s], vnode[t]
+        adj[s].append((_OUT, x))
+        adj[t].append((_IN, x))
+        adj[x].append((_SRC, s))
+        adj[x].append((_TGT, t))
+    a = len(vs) + len(es)
+    for v, group in arcs:
+        y = vnode[v]
+        for e in group:
+            x = enode[e]
+            adj[a].append((_ARC_E, x))
+            adj[x].append((_E_ARC, a))
+        adj[a].append((_ARC_V, y))
+        adj[y].append((_V_ARC, a))
+        a += 1
+    return nodes, keys, adj
+
+
+def _ranks(items):
+    index = {x: i for i, x in enumerate(sorted(set(items)))}
+    return [index[x] for x in items], len(index)
+
+
+def _refine(colours, adj):
+    """Colour refinement. Returns the coarsest stable colouring finer than the
+    given one, with colours numbered 0, 1, ... in a canonical order."""
+    colours, k = _ranks(colours)
+    while True:
+        sigs = [(colours[x], tuple(sorted((l, colours[y]) for l, y in nbrs)))
+                for x, nbrs in enumerate(adj)]
+        new, k1 = _ranks(sigs)
+        if k1 == k: return new
+        colours, k = new, k1
+
+
+def _certificate(colours, keys, adj):
+    order = sorted(range(len(colours)), key=colours.__getitem__)
+    links = sorted((colours[x], l, colours[y]) for x, nbrs in enumerate(adj) for l, y in nbrs)
+    return (tuple(keys[x] for x in order), tuple(links))
+
+
+def _orbit_rep(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def _canonical(g):
+    """Returns (nodes, colours, certificate) for a canonical discrete colouring."""
+    nodes, keys, adj = _coloured_graph(g)
+    n = len(nodes)
+    initial, _ = _ranks(keys)
+    best = [None, None]  # certificate, colouring
+    automorphisms = []
+
+    def search(colours, prefix):
+        colours = _refine(colours, adj)
+        cells = dict()
+        for x, c in enumerate(colours): cells.setdefault(c, []).append(x)
+        if len(cells) == n:
+            cert = _certificate(colours, keys, adj)
+            if best[0] is None or cert < best[0]:
+                best[0], best[1] = cert, colours
+            elif cert == best[0]:
+                # the two leaves differ by an automorphism
+                inv = [0] * n
+                for x, c in enumerate(best[1]): inv[c] = x
+                automorphisms.append([inv[c] for c in colours])
+            return
+
+        # split the smallest non-trivial cell, first by colour
+        c = min((len(xs), c) for c, xs in cells.items() if len(xs) > 1)[1]
+        tried = []
+        for x in cells[c]:
+            # skip x if an automorphism fixing the prefix maps a tried node to it
+            if tried:
+                parent = list(range(n))
+                for p in automorphisms:
+                    if all(p[y] == y for y in prefix):
+                        for y in range(n):
+                            a, b = _orbit_rep(parent, y), _orbit_rep(parent, p[y])
+                            if a != b: parent[a] = b
+                rx = _orbit_rep(parent, x)
+                if any(_orbit_rep(parent, y) == rx for y in tried): continue
+            tried.append(x)
+            search([2 * c1 + (0 if y == x else 1) for y, c1 in enumerate(colours)], prefix + [x])
+
+    search(initial, [])
+    return nodes, best[1], best[0]
+
+
+def canonical_labelling(g):
+    """Returns a pair of dicts mapping the vertices, respectively edges, of g to
+    0, 1, ... such that isomorphic graphs get the same labelling up to
+    isomorphism."""
+    nodes, colours, _ = _canonical(g)
+    order = sorted(range(len(nodes)), key=colours.__getitem__)
+    vmap, emap = dict(), dict()
+    for x in order:
+        kind, i = nodes[x]
+        if kind == 'v': vmap[i] = len(vmap)
+        elif kind == 'e': emap[i] = len(emap)
+    return vmap, emap
+
+
+def canonical_form(g):
+    """Returns a hashable certificate for g, which is equal for two graphs
+    exactly when they are isomorphic."""
+    return _canonical(g)[2]
+
+
+def canonical_hash(g):
+    """Returns a hex digest of the canonical form of g. It is stable between runs,
+    so it can be stored alongside saved graphs."""
+    return hashlib.sha256(repr(canonical_form(g)).encode('utf-8')).hexdigest()
+
+
+def _invariant(g):
+    return (g.num_vertices(), g.num_edges(),
+            sorted(g.types().values()),
+            sorted(str(g.edata(e, default='')) for e in g.edges()))
+
+
+def is_isomorphic(g1, g2):
+    """Returns True if g1 and g2 are equal up to renumbering of vertices and
+    edges, taking types, edge data, arcs, inputs and outputs into account."""
+    if _invariant(g1) != _invariant(g2): return False
+    return canonical_form(g1) == canonical_form(g2)
+
+
+class NetIndex(object):
+    """A set of graphs up to isomorphism, keyed by canonical hash."""
+    def __init__(self, graphs=()):
+        self.nets = dict()
+        for g in graphs: self.add(g)
+
+    def add(self, g):
+        """Add g to the index. Returns True if no isomorphic graph was in the
+        index yet."""
+        h = canonical_hash(g)
+        if h in self.nets: return False
+        self.nets[h] = g
+        return True
+
+    def get(self, g, default=None):
+        """Returns the stored graph isomorphic to g, if any."""
+        return self.nets.get(canonical_hash(g), default)
+
+    def __contains__(self, g):
+        return canonical_hash(g) in self.nets
+
+    def __len__(self):
+        return len(self.nets)
+
+    def __iter__(self):
+        return iter(self.nets.values())
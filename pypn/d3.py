@@ -20,18 +20,28 @@ from fractions import Fraction
 
 __all__ = ['init', 'draw']
 
-try:
-    from IPython.display import display, HTML
-    in_notebook = True
-    javascript_location = '../js'
-except ImportError:
-    in_notebook = False
-    javascript_location = '/js'
+in_notebook = None
+in_webpage = None
+javascript_location = None
+
+def _detect_environment():
+    """Work out whether we are running in a Jupyter notebook or a webpage. This is
+    only done when something is drawn, since importing IPython is slow."""
+    global in_notebook, in_webpage, javascript_location, display, HTML
+    if in_notebook is not None: return
     try:
-        from browser import document, html
-        in_webpage = True
-    except ImportError:
+        from IPython.display import display, HTML
+        in_notebook = True
         in_webpage = False
+        javascript_location = '../js'
+    except ImportError:
+        in_notebook = False
+        javascript_location = '/js'
+        try:
+            from browser import document, html
+            in_webpage = True
+        except ImportError:
+            in_webpage = False
 
 # Provides functions for displaying hocc graphs in jupyter notebooks using d3
 
@@ -40,12 +50,15 @@ except ImportError:
 # javascript_location = '../js'
 
 
-def draw(g, scale=None, row_scale=1, labels=False):
+def draw(g, scale=None, row_scale=1, labels=False, collapse=None):
+    """Draw a graph in a notebook. If collapse is given, formula subtrees with at
+    most that many vertices are drawn as a single node, see :func:`graph_data`."""
     #global _d3_display_seq
     if not g:
         print("FAIL")
         return
 
+    _detect_environment()
     if not in_notebook and not in_webpage: 
         raise Exception("This method only works when loaded in a webpage or Jupyter notebook")
 
@@ -69,22 +82,9 @@ def draw(g, scale=None, row_scale=1, labels=False):
     w = (g.depth() + 2) * scale * row_scale
     h = (g.position_count() + 3) * scale
 
-    nodes = [{'name': str(v),
-              'x': (g.row(v) + 1) * scale * row_scale,
-              'y': (g.position(v) + 2) * scale,
-              't': g.type(v) }
-             for v in g.vertices()]
-    links = [{'id': str(e),
-              'label': str(g.edata(e, default='')),
-              'source': str(g.edge_s(e)),
-              'target': str(g.edge_t(e)),
-              'edge_index': g.edge_index(e),
-              'num_edge_siblings': g.num_edge_siblings(e),
-              'flip_orientation': g.edge_s(e) > g.edge_t(e) } for e in g.edges()]
-    arcs = [{'source': str(e1),
-             'target': str(e2),
-             'at_v': str(at_v)} for e1,e2,at_v in g.arcs()]
-    graphj = json.dumps({'nodes': nodes, 'links': links, 'arcs': arcs})
+    # JSON is valid javascript, so the data is embedded directly rather than parsed
+    graphj = json.dumps(graph_data(g, scale, row_scale, collapse),
+                        separators=(',', ':')).replace('</', '<\\/')
     text = """
         <div style="overflow:auto" id="graph-output-{0}"></div>
         <script type="text/javascript">
@@ -92,11 +92,139 @@ def draw(g, scale=None, row_scale=1, labels=False):
                          paths: {{d3: "d3.v4.min"}} }});
         require(['hocc'], function(hocc) {{
             hocc.showGraph('{0}', '#graph-output-{0}',
-            JSON.parse('{2}'), {3}, {4}, {5}, {6}, {7});
+            {2}, {3}, {4}, {5}, {6}, {7});
         }});
         </script>
         """.format(seq, javascript_location, graphj, w, h, scale, node_size,
             'true' if labels else 'false')
     
     display(HTML(text))
-    
+
+def graph_data(g, scale=50, row_scale=1, collapse=None):
+    """Lay out g for drawing, in a columnar format: 'nodes' and 'links' hold one
+    list per attribute, indexed by node and link number respectively. Edge labels
+    are stored once in 'labels' and referred to by index. Each arc is a list of
+    the links it crosses at its vertex 'at_v', by index.
+
+    If collapse is an integer, each maximal formula subtree with at most that many
+    vertices is replaced by its root, whose 'n' attribute then gives the number of
+    vertices it stands for."""
+    rep = _collapse(g, collapse) if collapse else dict()
+
+    ntab = dict()
+    name, xs, ys, ts, ns = [], [], [], [], []
+    for v in g.vertices():
+        if v in rep: continue
+        ntab[v] = len(name)
+        name.append(v)
+        xs.append(round((g.row(v) + 1) * scale * row_scale, 2))
+        ys.append(round((g.position(v) + 2) * scale, 2))
+        ts.append(g.type(v))
+        ns.append(1)
+    for v, r in rep.items(): ns[ntab[r]] += 1
+
+    # edge_index and num_edge_siblings count parallel edges in order of edge id,
+    # which is also the order of g.edges()
+    ltab = dict()
+    labels = []
+    label_index = dict()
+    sources, targets, label, edge_index, siblings = [], [], [], [], []
+    pair_count = dict()
+    pairs = []
+    for e in g.edges():
+        s, t = g.edge_st(e)
+        s = rep.get(s, s)
+        t = rep.get(t, t)
+        if collapse and s == t and (g.edge_s(e) in rep or g.edge_t(e) in rep): continue
+        ltab[e] = len(sources)
+        sources.append(ntab[s])
+        targets.append(ntab[t])
+
+        d = g.edata(e, default='')
+        l = label_index.get(id(d))
+        if l is None:
+            l = label_index[id(d)] = len(labels)
+            labels.append(str(d))
+        label.append(l)
+
+        p = (s, t) if s < t else (t, s)
+        i = pair_count.get(p, 0)
+        pair_count[p] = i + 1
+        edge_index.append(i)
+        pairs.append(p)
+    siblings = [pair_count[p] for p in pairs]
+
+    # one arc per connective, through its edges in order of where they lead
+    arc_links, arc_v = [], []
+    for at_v, es in g.arc_groups():
+        if at_v in rep: continue
+        ls = [ltab[e] for e in es if e in ltab]
+        if len(ls) < 2: continue
+        ls.sort(key=lambda l: ys[targets[l] if sources[l] == ntab[at_v] else sources[l]])
+        arc_links.append(ls)
+        arc_v.append(ntab[at_v])
+
+    nodes = {'name': name, 'x': xs, 'y': ys, 't': ts}
+    if collapse: nodes['n'] = ns
+    return {'nodes': nodes,
+            'labels': labels,
+            'links': {'source': sources, 'target': targets, 'label': label,
+                      'edge_index': edge_index, 'num_edge_siblings': siblings},
+            'arcs': {'links': arc_links, 'at_v': arc_v}}
+
+def _collapse(g, size):
+    """Returns a dict sending each vertex of a formula subtree with at most size
+    vertices to the root of the largest such subtree containing it. The parent
+    edge of a tensor or par vertex is the one labelled by a tensor or par, and
+    that of a boundary vertex is its only edge."""
+    from .expr import Tensor, Par
+    connective = {1: Tensor, 2: Par}
+    parent_edge = dict()
+    for v in g.vertices():
+        ty = g.type(v)
+        if ty == 0:
+            es = g.incident_edges(v)
+            if len(es) == 1: parent_edge[v] = next(iter(es))
+            continue
+        cls = connective.get(ty)
+        if cls is None: continue
+        for e in g.incident_edges(v):
+            if isinstance(g.edata(e), cls):
+                parent_edge[v] = e
+                break
+
+    children = dict()
+    roots = []
+    for v, e in parent_edge.items():
+        s, t = g.edge_st(e)
+        u = s if t == v else t
+        if u in parent_edge and parent_edge[u] != e:
+            children.setdefault(u, []).append(v)
+        else:
+            roots.append(v)
+
+    # sizes in post-order, then fold maximal small subtrees top-down
+    count = dict()
+    for r in roots:
+        stack = [(r, False)]
+        while stack:
+            v, done = stack.pop()
+            if done:
+                count[v] = 1 + sum(count[c] for c in children.get(v, ()))
+            else:
+                stack.append((v, True))
+                stack.extend((c, False) for c in children.get(v, ()))
+
+    rep = dict()
+    stack = list(roots)
+    while stack:
+        v = stack.pop()
+        if count[v] <= size:
+            below = list(children.get(v, ()))
+            while below:
+                c = below.pop()
+                rep[c] = v
+                below.extend(children.get(c, ()))
+        else:
+            stack.extend(children.get(v, ()))
+    return rep
@@ -14,11 +14,6 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-import abc
-from fractions import Fraction
-import math
-import cmath
-import copy
 
 
 class Graph(object):
@@ -106,8 +101,8 @@ class Graph(object):
             if e in self._edata:
                 g.set_edata(e1, self._edata[e])
 
-        for e1,e2,at_v in self.arcs():
-            g.add_arc(etab[e1], etab[e2], vtab[at_v])
+        for v, es in self.arc_groups():
+            g.add_arc_group(vtab[v], [etab[e] for e in es])
 
         return g
 
@@ -115,24 +110,97 @@ class Graph(object):
         """Returns a new graph equal to the dual of this graph."""
         return self.copy(dual=True)
 
-    # def compose(self, other):
-    #     """Inserts a circuit after this one. The amount of positions of the circuits must match."""
-    #     if self.position_count() != other.position_count():
-    #         raise TypeError("Circuits work on different position amounts")
-    #     self.normalise()
-    #     other = other.copy()
-    #     other.normalise()
-    #     for o in self.outputs:
-    #         q = self.position(o)
-    #         e = list(self.incident_edges(o))[0]
-    #         if self.edge_type(e) == 2: #hadamard edge
-    #             i = [v for v in other.inputs if other.position(v)==q][0]
-    #             e = list(other.incident_edges(i))[0]
-    #             other.set_edge_type(e, 3-other.edge_type(e)) # toggle the edge type
-    #     d = self.depth()
-    #     self.replace_subgraph(d-1,d,other)
-
-    
+    def to_bytes(self):
+        """Serialize the graph in the compact binary format of :mod:`pypn.serialize`."""
+        from .serialize import to_bytes
+        return to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Read a graph from a bytes-like object produced by :meth:`to_bytes`."""
+        from .serialize import from_bytes
+        return from_bytes(data, cls=cls)
+
+    def save(self, path):
+        """Write the graph to a file in binary format."""
+        from .serialize import save
+        save(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Read a graph from a file written by :meth:`save`."""
+        from .serialize import load
+        return load(path, mmap, cls=cls)
+
+    def canonical_hash(self):
+        """A hash that is equal for graphs that are the same up to renumbering. See
+        :mod:`pypn.canon`."""
+        from .canon import canonical_hash
+        return canonical_hash(self)
+
+    def is_isomorphic(self, other):
+        """Returns True if the graphs are the same up to renumbering."""
+        from .canon import is_isomorphic
+        return is_isomorphic(self, other)
+
+    def compose(self, other):
+        """Plugs the outputs of this graph into the inputs of other, in order. The edge
+        into each output and the edge out of the matching input are joined into a single
+        edge. Returns the list of these edges, which are the cuts when both graphs are
+        proof nets. The vertices of other are placed after this graph."""
+        if len(self.outputs) != len(other.inputs):
+            raise ValueError("Cannot plug {} outputs into {} inputs".format(
+                len(self.outputs), len(other.inputs)))
+        joins = []
+        for o, i in zip(self.outputs, other.inputs):
+            ie = self.in_edges(o)
+            oe = other.out_edges(i)
+            if len(ie) != 1 or len(oe) != 1 or self.out_edges(o) or other.in_edges(i):
+                raise ValueError("Boundary vertices must have exactly one edge")
+            e1, e2 = next(iter(ie)), next(iter(oe))
+            d1, d2 = self.edata(e1), other.edata(e2)
+            if d1 != None and d2 != None and d1 != d2:
+                raise ValueError("Cannot plug {} into {}".format(d1, d2))
+            joins.append((e1, e2))
+
+        # align the inputs of other with the outputs of this graph
+        rs = other.rows()
+        dr = self.depth() - min(rs.values()) if rs else 0
+        dp = 0
+        if self.outputs and self.position(self.outputs[0]) != -1:
+            dp = self.position(self.outputs[0]) - other.position(other.inputs[0])
+
+        ty = other.types()
+        ps = other.positions()
+        vtab = dict()
+        for v in other.vertices():
+            v1 = self.add_vertex(ty[v])
+            if v in ps: self.set_position(v1, ps[v] + dp)
+            if v in rs: self.set_row(v1, rs[v] + dr)
+            vtab[v] = v1
+            if v in other._vdata:
+                self.set_vdata(v1, other._vdata[v])
+        etab = dict()
+        for e in other.edges():
+            s,t = other.edge_st(e)
+            etab[e] = self.add_edge(vtab[s], vtab[t], other.edata(e))
+        for v, es in other.arc_groups():
+            self.add_arc_group(vtab[v], [etab[e] for e in es])
+
+        cuts = []
+        removed = []
+        for (e1, e2), o, i in zip(joins, self.outputs, other.inputs):
+            e2 = etab[e2]
+            d = self.edata(e1)
+            c = self.add_edge(self.edge_s(e1), self.edge_t(e2), d if d != None else self.edata(e2))
+            self.copy_arcs(e1, c)
+            self.copy_arcs(e2, c)
+            cuts.append(c)
+            removed += [o, vtab[i]]
+        outputs = [vtab[v] for v in other.outputs]
+        self.remove_vertices(removed)
+        self.outputs = outputs
+        return cuts
 
     def pack_rows(self):
         """Compresses the rows of the graph so that every index is used."""
@@ -226,67 +294,95 @@ class Graph(object):
         return v
 
     def add_edge(self, source, target, data=None):
+        e = self._eindex
+        nhd = self.graph[source].get(target)
+        if nhd is None:
+            nhd = self.graph[source][target] = [set(), set()]
+            self.graph[target][source] = [set(), set()]
+        nhd[1].add(e)
+        self.graph[target][source][0].add(e)
+        self._source[e] = source
+        self._target[e] = target
+        self._arcs[e] = dict()
         if data != None:
-            self.add_edges([(source, target)], [data])
-        else:
-            self.add_edges([(source, target)])
-        return self._eindex - 1
+            self._edata[e] = data
+        self._eindex += 1
+        return e
 
     def add_arc(self, e1, e2, at_v):
         """Adds an arc between edges. e1 and e2 are the edges, at_v indicates which
-        vertex to put the arc at (where -1 means both)."""
-
-        if e2 in self._arcs[e1]:
-            if at_v == self._arcs[e1][e2]: return
-            else: at_v = -1
-        
-        self._arcs[e1][e2] = at_v
-        self._arcs[e2][e1] = at_v
-
-    def remove_arc(self, e1, e2, at_v):
-        """Removes an arc between edges e1 and e2 nearest to vertex at_v, where -1 means
-        both ends."""
-
-        if e2 in self._arcs[e1]:
-            if self._arcs[e1][e2] == -1 and at_v != -1:
-                s,t = self.edge_st(e1)
-                other_v = s if t == at_v else t
-                self._arcs[e1][e2] = other_v
-                self._arcs[e2][e1] = other_v
+        vertex to put the arc at (where -1 means both). The arcs at a vertex form
+        one group (see :meth:`add_arc_group`), so arcs are transitive: if e1
+        already has an arc to e3 at that vertex, e2 gets one to e3 as well."""
+        for v in (self.edge_st(e1) if at_v == -1 else (at_v,)):
+            self.add_arc_group(v, (e1, e2))
+
+    def add_arc_group(self, v, es):
+        """Adds an arc at v between all of the edges es (a hyperarc). The arcs at a
+        vertex form one group, stored once and shared by its edges, so groups
+        the edges are already in at v are merged."""
+        grp = None
+        for e in es:
+            g1 = self._arcs[e].get(v)
+            if g1 is None or g1 is grp: continue
+            if grp is None:
+                grp = g1
             else:
-                del self._arcs[e1][e2]
-                del self._arcs[e2][e1]
+                if len(g1) > len(grp): grp, g1 = g1, grp
+                grp |= g1
+                for e1 in g1: self._arcs[e1][v] = grp
+        if grp is None: grp = set()
+        for e in es:
+            grp.add(e)
+            self._arcs[e][v] = grp
 
-        
+    def remove_arc(self, e1, e2, at_v):
+        """Removes an arc between edges e1 and e2 at vertex at_v, where -1 means
+        both ends. Since the arcs at a vertex form a group, this takes e2 out of
+        the group of e1."""
+        for v in (self.edge_st(e1) if at_v == -1 else (at_v,)):
+            grp = self._arcs[e1].get(v)
+            if grp is not None and e2 in grp and e1 != e2:
+                self._leave_arc_group(e2, v)
+
+    def _leave_arc_group(self, e, v):
+        grp = self._arcs[e].pop(v)
+        grp.discard(e)
+        if len(grp) == 1:
+            del self._arcs[next(iter(grp))][v]
 
     def copy_arcs(self, e1, e2):
-        """Copy the arcs from e1 on to e2. Note if there is already an arc from e1 to e2,
-        this does not create a 'self-arc'."""
-        for e3, at_v in self._arcs[e1].items():
-            if e2 == e3: continue
-            s,t = self.edge_st(e2)
-
-            if at_v == -1:
-                s1,t1 = self.edge_st(e3)
-                if (s == s1 and t == t1) or (s == t1 and t == s1):
-                    self.add_arc(e2, e3, -1)
-            elif s == at_v or t == at_v:
-                self.add_arc(e2, e3, at_v)
+        """Copy the arcs from e1 on to e2, at the ends e2 shares with e1. This puts
+        e2 in the same groups as e1, so until e1 is removed they also have an
+        arc between them."""
+        s,t = self.edge_st(e2)
+        for v in list(self._arcs[e1]):
+            if v == s or v == t:
+                self.add_arc_group(v, (e1, e2))
 
     def has_arc(self, e1, e2=None):
         """Return whether there is any arc between e1 and e2 (if e2 given), otherwise
-        whether there are any arcs connected to e1."""
+        whether there are any arcs connected to e1. Edges are in an arc if they
+        are in the same group at some vertex, even if no arc was added between
+        the two of them directly."""
         if e2 == None:
             return len(self._arcs[e1]) != 0
         else:
-            return e2 in self._arcs[e1]
+            return e1 != e2 and any(e2 in grp for grp in self._arcs[e1].values())
 
     def arcs_at_v(self, v):
-        for e in self.incident_edges(v):
-            for e1,at_v in self._arcs[e].items():
-                if e <= e1 and at_v == v: yield (e,e1)
-
+        for es in self._groups_at(v):
+            es = sorted(es)
+            for i, e in enumerate(es):
+                for e1 in es[i+1:]: yield (e,e1)
 
+    def _groups_at(self, v):
+        seen = set()
+        for e in self.incident_edges(v):
+            grp = self._arcs[e].get(v)
+            if grp is not None and id(grp) not in seen:
+                seen.add(id(grp))
+                yield grp
 
     def signalling_nhd(self, v):
         ty = self.type(v)
@@ -439,22 +535,61 @@ class Graph(object):
         return range(self._vindex - amount, self._vindex)
 
     def add_edges(self, edges, data=None):
+        graph = self.graph
+        source = self._source
+        target = self._target
+        arcs = self._arcs
+        e = self._eindex
         for i in range(len(edges)):
             s,t = edges[i]
-            if not t in self.graph[s]:
-                self.graph[s][t] = [set(), set()]
-                self.graph[t][s] = [set(), set()]
-            self.graph[s][t][1].add(self._eindex)
-            self.graph[t][s][0].add(self._eindex)
-            self._source[self._eindex] = s
-            self._target[self._eindex] = t
-            self._arcs[self._eindex] = dict()
-            if data != None:
-                self._edata[self._eindex] = data[i]
-            self._eindex += 1
+            nhd = graph[s].get(t)
+            if nhd is None:
+                nhd = graph[s][t] = [set(), set()]
+                graph[t][s] = [set(), set()]
+            nhd[1].add(e)
+            graph[t][s][0].add(e)
+            source[e] = s
+            target[e] = t
+            arcs[e] = dict()
+            e += 1
+        if data != None:
+            self._edata.update(zip(range(self._eindex, e), data))
+        self._eindex = e
 
         return range(self._eindex - len(edges), self._eindex)
 
+    def add_arrays(self, types, rows, positions, edges, edata=None, arcs=(), arc_groups=()):
+        """Add a whole subgraph in one go and return the new vertices and edges
+        as ranges. Vertices are given as parallel lists of types, rows and
+        positions. Edges are (source, target) pairs, arcs are (e1, e2, at_v)
+        triples and arc_groups are (at_v, edges) pairs as in :meth:`add_arc_group`,
+        where vertex and edge indices count from the first new vertex and edge,
+        respectively."""
+        vs = self.add_vertices(len(types))
+        v0 = vs.start
+        self.ty.update(zip(vs, types))
+        if rows:
+            self._rindex.update(zip(vs, rows))
+            self._maxr = max(self._maxr, max(rows))
+        if positions:
+            self._pindex.update(zip(vs, positions))
+            self._maxp = max(self._maxp, max(positions))
+
+        es = self.add_edges([(s + v0, t + v0) for s,t in edges], edata)
+        e0 = es.start
+        for e1, e2, at_v in arcs:
+            self.add_arc_group(at_v + v0, (e1 + e0, e2 + e0))
+        for at_v, aes in arc_groups:
+            self.add_arc_group(at_v + v0, [e + e0 for e in aes])
+        return vs, es
+
+    @classmethod
+    def from_arrays(cls, types, rows, positions, edges, edata=None, arcs=(), arc_groups=()):
+        """Construct a new graph from arrays, as in :meth:`add_arrays`."""
+        g = cls()
+        g.add_arrays(types, rows, positions, edges, edata, arcs, arc_groups)
+        return g
+
     def remove_vertices(self, vertices):
         for v in vertices:
             # vs = list(self.graph[v])
@@ -474,6 +609,9 @@ class Graph(object):
             except: pass
             self._vdata.pop(v,None)
 
+        if self.inputs: self.inputs = [v for v in self.inputs if v in self.graph]
+        if self.outputs: self.outputs = [v for v in self.outputs if v in self.graph]
+
     def remove_vertex(self, vertex):
         self.remove_vertices([vertex])
 
@@ -482,8 +620,8 @@ class Graph(object):
             s,t = self.edge_st(e)
             del self._source[e]
             del self._target[e]
-            for e1 in list(self._arcs[e]):
-                self.remove_arc(e,e1,at_v=-1)
+            for v in list(self._arcs[e]):
+                self._leave_arc_group(e, v)
             del self._arcs[e]
 
             self.graph[s][t][1].remove(e)
@@ -520,18 +658,23 @@ class Graph(object):
         return self._source.keys()
 
     def arcs(self):
-        ar = []
-        for e1 in self.edges():
-            for e2, a in self._arcs[e1].items():
-                if e1 <= e2:
-                    if a == -1:
-                        s,t = self.edge_st(e1)
-                        ar.append((e1,e2,s))
-                        ar.append((e1,e2,t))
-                    else:
-                        ar.append((e1,e2,a))
-
-        return ar
+        """Returns the arcs as (e1, e2, at_v) triples with e1 < e2, one for each pair
+        of edges in each group (see :meth:`arc_groups`)."""
+        return [(es[i], e2, v) for v, es in self.arc_groups()
+                for i in range(len(es)) for e2 in es[i+1:]]
+
+    def arc_groups(self):
+        """Returns the arcs as (at_v, edges) pairs, one for each vertex with arcs,
+        where edges are the edges with an arc between each other at at_v, in
+        order. Unlike :meth:`arcs`, this is linear in the number of edges."""
+        seen = set()
+        groups = []
+        for e in self.edges():
+            for v, grp in self._arcs[e].items():
+                if id(grp) not in seen:
+                    seen.add(id(grp))
+                    groups.append((v, sorted(grp)))
+        return groups
 
     # def edges_in_range(self, start, end, safe=False):
     #     """like self.edges, but only returns edges that belong to vertices 
@@ -0,0 +1,115 @@
+# HOCC - Python library for higher order causal categories
+# Copyright (C) 2019 - Aleks Kissinger
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Reuse of proven sub-sequents in the proof search.
+
+The leaves of the graph built for A |- B are labelled (0, k) for the k-th
+variable of A and (1, k) for the k-th variable of B, from left to right. A
+linking is a list of pairs of labels saying which leaves are fused together,
+which is all that is needed to rebuild a proof net from its sequent.
+
+A :class:`LemmaCache` stores the linkings of proven sequents. When proving
+A |- B, every compound subformula S of A and T of B such that S |- T is a
+cached lemma, or S and T are equal (an identity), gives a partial linking. The
+largest non-overlapping ones are fused up front, and only the remaining leaves
+are searched. The result is still checked as usual, and if the lemmas don't
+extend to a proof the search starts over from scratch.
+"""
+
+from .expr import Var, Unit
+from . import proofnet
+
+__all__ = ['LemmaCache']
+
+
+def _occurrences(e, out, offset=0):
+    """Appends (str(S), offset, leaves) to out for each compound subformula S of
+    e, where offset is the number of variables before S. Returns the number of
+    variables in e."""
+    if isinstance(e, Var): return 1
+    if isinstance(e, Unit): return 0
+    n = 0
+    for c in e.children():
+        n += _occurrences(c, out, offset + n)
+    out.append((str(e), offset, n))
+    return n
+
+
+class LemmaCache(object):
+    """A cache of linkings of proven sequents, keyed by the strings of their
+    formulas. Pass it to :func:`pypn.proofnet.prove` as lemmas to use it, which
+    also adds each sequent proven that way. If identities is set, equal compound
+    subformulas on the two sides are linked to each other."""
+    def __init__(self, identities=True):
+        self.identities = identities
+        self.lemmas = dict()
+        self.hits = 0
+
+    def add(self, exp0, exp1, linking):
+        """Add a linking for the sequent exp0 |- exp1."""
+        linking = tuple((a,b) for a,b in linking if a is not None and b is not None)
+        self.lemmas.setdefault(str(exp0), dict())[str(exp1)] = linking
+
+    def add_proof(self, exp0, exp1, checker=None):
+        """Prove exp0 |- exp1 and add its linking. Returns the proof net, or None."""
+        return proofnet.prove(exp0, exp1, checker, lemmas=self)
+
+    def get(self, exp0, exp1, default=None):
+        return self.lemmas.get(str(exp0), dict()).get(str(exp1), default)
+
+    def __contains__(self, seq):
+        return self.get(seq[0], seq[1]) is not None
+
+    def __len__(self):
+        return sum(len(d) for d in self.lemmas.values())
+
+    def plan(self, exp0, exp1):
+        """Returns the pairs of leaf labels of exp0 |- exp1 given by cached lemmas and
+        identities on disjoint parts of the sequent, largest first."""
+        occ0, occ1 = [], []
+        _occurrences(exp0, occ0)
+        _occurrences(exp1, occ1)
+        index1 = dict()
+        for t, off, n in occ1: index1.setdefault(t, []).append((off, n))
+
+        candidates = []
+        for s, off0, n0 in occ0:
+            if self.identities:
+                for off1, n1 in index1.get(s, ()):
+                    candidates.append((n0 + n1, off0, off1, None))
+            for t, linking in self.lemmas.get(s, dict()).items():
+                for off1, n1 in index1.get(t, ()):
+                    candidates.append((n0 + n1, off0, off1, (n0, n1, linking)))
+        candidates.sort(key=lambda c: -c[0])
+
+        used = (set(), set())
+        links = []
+        for size, off0, off1, lemma in candidates:
+            if lemma is None:
+                n0 = n1 = size // 2
+                linking = [((0,k), (1,k)) for k in range(n0)]
+            else:
+                n0, n1, linking = lemma
+            r0 = range(off0, off0 + n0)
+            r1 = range(off1, off1 + n1)
+            if any(k in used[0] for k in r0) or any(k in used[1] for k in r1): continue
+            used[0].update(r0)
+            used[1].update(r1)
+            offsets = (off0, off1)
+            links.extend(((a[0], a[1] + offsets[a[0]]), (b[0], b[1] + offsets[b[0]]))
+                         for a,b in linking)
+            self.hits += 1
+        return links
@@ -0,0 +1,210 @@
+# HOCC - Python library for higher order causal categories
+# Copyright (C) 2019 - Aleks Kissinger
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Parser for formulas and sequents written in the notation of ``str(e)``.
+
+Binary operators are, from loosest to tightest binding, ``>>`` (or ``-o``),
+``+`` and ``*``, all left associative as in Python, while ``~`` is a prefix
+operator. ``I`` is the unit. Variables whose names start with a lower-case
+letter are atoms, as in :mod:`pypn.variables`. Sequents are written
+``A |- B`` (or ``A ⊢ B``), where an empty side stands for ``I``.
+
+The resulting formulas are the same as the ones built by the Python operators,
+but are constructed in a single pass and hash-consed, so equal subformulas
+are represented by a single object.
+"""
+
+import re
+
+from .expr import Var, Par, Tensor, I
+
+__all__ = ['Parser', 'parse', 'parse_sequent', 'read_sequents']
+
+_TOKEN = re.compile(r"(\|-|⊢)|(>>|-o)|([+*~()])|([A-Za-z_][A-Za-z0-9_']*)|(\S)")
+
+class Parser(object):
+    """Parses formulas, sharing equal subformulas between all the formulas it
+    has read. ``atom`` decides from a variable name whether it is an atom."""
+    def __init__(self, atom=None):
+        self.atom = atom if atom else lambda name: name[0].islower()
+        self.table = dict()
+
+    def parse(self, s):
+        """Parse a single formula."""
+        try:
+            return self._parse(s)
+        except RecursionError:
+            raise ValueError("Formula nested too deeply in: " + s) from None
+
+    def parse_sequent(self, s):
+        """Parse a sequent 'A |- B' into a pair of formulas."""
+        try:
+            return self._parse_sequent(s)
+        except RecursionError:
+            raise ValueError("Formula nested too deeply in: " + s) from None
+
+    def _parse(self, s):
+        toks = self._tokens(s)
+        node, i = self._imp(toks, 0, s)
+        if i != len(toks): self._error(s, toks, i)
+        return self._expr(node, False)
+
+    def _parse_sequent(self, s):
+        toks = self._tokens(s)
+        if toks and toks[0][0] == '|-':
+            lhs, i = I, 0
+        else:
+            node, i = self._imp(toks, 0, s)
+            lhs = self._expr(node, False)
+        if i == len(toks) or toks[i][0] != '|-': self._error(s, toks, i, "'|-'")
+        i += 1
+        if i == len(toks): return lhs, I
+        node, i = self._imp(toks, i, s)
+        if i != len(toks): self._error(s, toks, i)
+        return lhs, self._expr(node, False)
+
+    def _tokens(self, s):
+        toks = []
+        for m in _TOKEN.finditer(s):
+            k = m.lastindex
+            if k == 4: toks.append(('name', m.start(), m.group(4)))
+            elif k == 3: toks.append((m.group(3), m.start()))
+            elif k == 5:
+                raise ValueError("Unexpected character at position {} in: {}".format(m.start(), s))
+            else: toks.append(('>>' if k == 2 else '|-', m.start()))
+        return toks
+
+    def _error(self, s, toks, i, expected=None):
+        if i < len(toks): found = "'{}' at position {}".format(s[toks[i][1]:].split()[0], toks[i][1])
+        else: found = "end of input"
+        if expected: msg = "Expected {} but found {}".format(expected, found)
+        else: msg = "Unexpected " + found
+        raise ValueError(msg + " in: " + s)
+
+    # The syntax tree uses tuples: ('name', n), ('~', x) and (op, [x1, ..., xn]),
+    # where a chain of >> is kept as ('>>', xs, k) for its first k elements.
+
+    def _imp(self, toks, i, s):
+        node, i = self._binop(toks, i, s, '+')
+        if i < len(toks) and toks[i][0] == '>>':
+            xs = [node]
+            while i < len(toks) and toks[i][0] == '>>':
+                node, i = self._binop(toks, i+1, s, '+')
+                xs.append(node)
+            node = ('>>', xs, len(xs))
+        return node, i
+
+    def _binop(self, toks, i, s, op):
+        if op == '+': node, i = self._binop(toks, i, s, '*')
+        else: node, i = self._unary(toks, i, s)
+        if i < len(toks) and toks[i][0] == op:
+            xs = [node]
+            while i < len(toks) and toks[i][0] == op:
+                if op == '+': node, i = self._binop(toks, i+1, s, '*')
+                else: node, i = self._unary(toks, i+1, s)
+                xs.append(node)
+            node = (op, xs)
+        return node, i
+
+    def _unary(self, toks, i, s):
+        if i == len(toks): self._error(s, toks, i, "a formula")
+        t = toks[i][0]
+        if t == '~':
+            node, i = self._unary(toks, i+1, s)
+            return ('~', node), i
+        elif t == '(':
+            node, i = self._imp(toks, i+1, s)
+            if i == len(toks) or toks[i][0] != ')': self._error(s, toks, i, "')'")
+            return node, i+1
+        elif t == 'name':
+            return ('name', toks[i][2]), i+1
+        else:
+            self._error(s, toks, i, "a formula")
+
+    # Negation is pushed towards the variables while building, and nested pars
+    # and tensors are flattened into their parent, as Expr.__add__ and
+    # Expr.__mul__ do.
+
+    def _shape(self, node, neg):
+        """Returns the connective node becomes under the given polarity, and a
+        list of (child, polarity) pairs."""
+        op = node[0]
+        if op == '+' or op == '*':
+            cls = Par if (op == '+') != neg else Tensor
+            return cls, [(x, neg) for x in node[1]]
+        elif op == '>>':
+            xs, k = node[1], node[2]
+            first = ('>>', xs, k-1) if k > 2 else xs[0]
+            return (Tensor if neg else Par), [(first, not neg), (xs[k-1], neg)]
+        elif op == '~':
+            return self._shape(node[1], not neg)
+        else:
+            return None, None
+
+    def _collect(self, node, neg, cls, out):
+        cls1, ch = self._shape(node, neg)
+        if cls1 is cls:
+            for x, n in ch: self._collect(x, n, cls, out)
+        else:
+            out.append(self._expr(node, neg))
+
+    def _expr(self, node, neg):
+        cls, ch = self._shape(node, neg)
+        if cls is None:
+            while node[0] == '~':
+                node = node[1]
+                neg = not neg
+            name = node[1]
+            if name == 'I': return I
+            key = (Var, name, neg)
+            e = self.table.get(key)
+            if e is None:
+                e = self.table[key] = Var(name, dual=neg, atom=self.atom(name))
+            return e
+
+        out = []
+        for x, n in ch: self._collect(x, n, cls, out)
+        key = (cls,) + tuple(id(c) for c in out)
+        e = self.table.get(key)
+        if e is None:
+            e = self.table[key] = cls(out)
+        return e
+
+
+def parse(s, parser=None):
+    """Parse a formula from a string, e.g. ``parse("(X0 -o Y0) * X1")``."""
+    return (parser or Parser()).parse(s)
+
+def parse_sequent(s, parser=None):
+    """Parse a sequent 'A |- B' into a pair (A, B)."""
+    return (parser or Parser()).parse_sequent(s)
+
+def read_sequents(f, parser=None):
+    """Iterate over the sequents in a file (or a path to a file) with one sequent
+    per line, yielding pairs (A, B). Blank lines and lines starting with '#' are
+    skipped. Subformulas are shared across the whole file."""
+    if isinstance(f, str):
+        with open(f, encoding='utf-8') as f1:
+            for seq in read_sequents(f1, parser): yield seq
+        return
+    parser = parser or Parser()
+    for n, line in enumerate(f, 1):
+        line = line.strip()
+        if not line or line.startswith('#'): continue
+        try:
+            yield parser.parse_sequent(line)
+        except ValueError as ex:
+            raise ValueError("line {}: {}".format(n, ex))
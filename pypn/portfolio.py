@@ -0,0 +1,147 @@
+# HOCC - Python library for higher order causal categories
+# Copyright (C) 2019 - Aleks Kissinger
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Racing several prover configurations against each other.
+
+A configuration is a dict of keyword arguments for :func:`pypn.proofnet.prove`,
+with the checker given by name (see :data:`pypn.proofnet.CHECKERS`). A
+:class:`Portfolio` runs a number of them at once, each in its own process,
+takes the first proof net found and terminates the others. That a sequent is
+not provable is only taken as the answer once every configuration has found
+so, since configurations may differ in which nets they accept. Which
+configuration won is recorded, and later sequents are given to the
+configurations that won most often, plus one picked at random so that the
+others get a chance again.
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import random
+import time
+from collections import Counter
+
+from . import batch
+from . import proofnet
+
+__all__ = ['Portfolio', 'DEFAULT_CONFIGS']
+
+DEFAULT_CONFIGS = [
+    {'checker': 'cut', 'strategy': 'dfs', 'order': 'first'},
+    {'checker': 'cut', 'strategy': 'dfs', 'order': 'fewest'},
+    {'checker': 'switching', 'strategy': 'dfs', 'order': 'first'},
+    {'checker': 'switching', 'strategy': 'ids', 'order': 'fewest'},
+    {'checker': 'cut', 'strategy': 'best', 'order': 'fewest'},
+    {'checker': 'switching', 'strategy': 'dfs', 'order': 'fewest', 'samples': 2},
+]
+
+
+def config_name(config):
+    return ','.join('{}={}'.format(k, config[k]) for k in sorted(config))
+
+
+def _run(name, config, exp0, exp1, results):
+    try:
+        kwargs = dict(config)
+        checker = batch.checker_by_name(kwargs.pop('checker', 'cut'))
+        g = proofnet.prove(exp0, exp1, checker, **kwargs)
+        results.put((name, g, None))
+    except Exception as ex:
+        results.put((name, None, '{}: {}'.format(type(ex).__name__, ex)))
+
+
+class Portfolio(object):
+    """Proves sequents by racing up to size configurations in separate processes
+    (by default as many as there are CPUs). The number of races each
+    configuration took part in and won are kept in runs and wins, and the
+    configuration that answered last in winner."""
+    def __init__(self, configs=None, size=None, explore=True):
+        self.configs = dict((config_name(c), dict(c)) for c in (configs or DEFAULT_CONFIGS))
+        for c in self.configs.values(): batch.checker_by_name(c.get('checker', 'cut'))
+        self.size = min(size or os.cpu_count() or 1, len(self.configs))
+        self.explore = explore
+        self.runs = Counter()
+        self.wins = Counter()
+        self.time = Counter()
+        self.winner = None
+
+    def pick(self):
+        """Returns the names of the configurations to race next: those with the
+        best rate of wins so far, and one other at random if explore is set."""
+        def rate(name): return (self.wins[name] + 1) / (self.runs[name] + 2)
+        ranked = sorted(self.configs, key=lambda n: -rate(n))
+        if not self.explore or self.size == len(ranked) or self.size < 2:
+            return ranked[:self.size]
+        return ranked[:self.size - 1] + [random.choice(ranked[self.size - 1:])]
+
+    def prove(self, exp0, exp1, timeout=None):
+        """Returns the first proof net of exp0 |- exp1 found by any configuration, or
+        None if every one that didn't fail finds that there is none. Raises
+        TimeoutError if there is no answer within timeout seconds."""
+        names = self.pick()
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_run, daemon=True,
+                                         args=(n, self.configs[n], exp0, exp1, results))
+                 for n in names]
+        t = time.perf_counter()
+        for p in procs: p.start()
+        errors = []
+        unprovable = []
+        try:
+            while len(errors) + len(unprovable) < len(procs):
+                left = None if timeout is None else timeout - (time.perf_counter() - t)
+                if left is not None and left <= 0: raise queue.Empty
+                name, g, error = results.get(timeout=left)
+                if error is not None: errors.append(name + ': ' + error)
+                elif g is None: unprovable.append(name)
+                else: break
+            else:
+                if not unprovable:
+                    raise RuntimeError('every configuration failed: ' + '; '.join(errors))
+                name, g = unprovable[-1], None
+        except queue.Empty:
+            raise TimeoutError('no answer within {} seconds'.format(timeout)) from None
+        finally:
+            for p in procs:
+                if p.is_alive(): p.terminate()
+            for p in procs: p.join()
+            results.close()
+            self.runs.update(names)
+
+        self.wins[name] += 1
+        self.time[name] += time.perf_counter() - t
+        self.winner = name
+        return g
+
+    def stats(self):
+        """Returns runs, wins and the mean time of the wins per configuration."""
+        return dict((n, {'runs': self.runs[n], 'wins': self.wins[n],
+                         'time': self.time[n] / self.wins[n] if self.wins[n] else None})
+                    for n in self.configs)
+
+    def save(self, path):
+        """Write the records to a JSON file, so a later portfolio can start from them."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'runs': self.runs, 'wins': self.wins, 'time': self.time}, f)
+
+    def load(self, path):
+        """Add the records in a JSON file written by :meth:`save`."""
+        with open(path, encoding='utf-8') as f:
+            d = json.load(f)
+        for key in ('runs', 'wins', 'time'):
+            getattr(self, key).update(dict((n, v) for n, v in d.get(key, {}).items()
+                                           if n in self.configs))
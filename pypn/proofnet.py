@@ -1,58 +1,122 @@
+import heapq
 import math
+import random
+import time
+from collections import Counter, OrderedDict
 from itertools import chain, combinations
 
-from .expr import Tensor, Par, Var, Unit
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .expr import Tensor, Par, Var, Unit, I
 from .graph import Graph
+from .canon import canonical_hash
 
-def decompose(e, g, row=0):
+def decompose(e, g, row=0, atomic=None):
     if (isinstance(e, Unit)): return range(0,0), row
-    v = g.add_vertex(row=row)
-    pos, max_v, max_r = knuth_tree_layout(e, g, row, 0, v, 1)
-    g.set_position(v, pos / 2)
-    vs = range(v, max_v+1)
+    types, rows, positions, edges, edata, arcs, max_r = _arrays_at(e, 1, row, atomic)
+    vs, _ = g.add_arrays(types, rows, positions, edges, edata, arc_groups=arcs)
+    g.inputs.append(vs[0])
+    _label_leaves(g, vs, types, 0)
+    return vs, max_r
 
-    for v1 in vs:
-        if v1 != v and g.type(v1) == 0:
-            g.set_row(v1, max_r)
-        if g.type(v1) == 1:
-            for e1 in g.out_edges(v1):
-                for e2 in g.out_edges(v1):
-                    if e1 != e2: g.add_arc(e1, e2, v1)
+def compose(e, g, row=0, atomic=None):
+    if (isinstance(e, Unit)): return range(0,0), row
+    types, rows, positions, edges, edata, arcs, max_r = _arrays_at(e, -1, row, atomic)
+    vs, _ = g.add_arrays(types, rows, positions, edges, edata, arc_groups=arcs)
+    g.outputs.append(vs[0])
+    _label_leaves(g, vs, types, 1)
+    return vs, max_r
 
+def _label_leaves(g, vs, types, side):
+    """Labels the leaves of a formula tree (side, k) from left to right, so that
+    fusions can be recorded as pairs of labels."""
+    k = 0
+    for i in range(1, len(types)):
+        if types[i] == 0:
+            g.set_vdata(vs[i], (side, k))
+            k += 1
 
+def formula_arrays(e, edge_dir, row=0, atomic=None):
+    """Flatten the formula tree of e into the arrays taken by :meth:`Graph.add_arrays`,
+    laid out from the given row. Returns (types, rows, positions, edges, edata, arcs, max_r),
+    where arcs are the (at_v, edges) groups taken by add_arrays as arc_groups.
+    Edges point away from the root if edge_dir is 1 (decompose) and towards it if
+    edge_dir is -1 (compose). Subformulas whose id is in atomic are not decomposed,
+    but become leaves like variables."""
+    arrays = ([0], [row], [0], [], [], [])
+    types, rows, positions = arrays[0:3]
+    pos, max_r = knuth_tree_layout(e, row, 0, 0, edge_dir, arrays, dict(), atomic)
+    positions[0] = pos / 2
 
-    return vs, max_r
+    if edge_dir == 1:
+        for v in range(1, len(types)):
+            if types[v] == 0: rows[v] = max_r
+    else:
+        for v in range(len(types)):
+            if v != 0 and types[v] == 0: rows[v] = row
+            else: rows[v] = row + (max_r - rows[v])
 
-def compose(e, g, row=0):
-    if (isinstance(e, Unit)): return range(0,0), row
-    v = g.add_vertex(row=row)
-    pos, max_v, max_r = knuth_tree_layout(e, g, row, 0, v, -1)
-    g.set_position(v, pos / 2)
-    vs = range(v, max_v+1)
-
-    for v1 in vs:
-        if v1 != v and g.type(v1) == 0:
-            g.set_row(v1, row)
-        else:
-            g.set_row(v1, row + (max_r - g.row(v1)))
-        if g.type(v1) == 2:
-            for e1 in g.in_edges(v1):
-                for e2 in g.in_edges(v1):
-                    if e1 != e2: g.add_arc(e1, e2, v1)
+    return arrays + (max_r,)
 
-    return vs, max_r
+# formula graphs already laid out, by edge_dir and formula, most recently used last
+_templates = OrderedDict()
+TEMPLATE_CACHE_SIZE = 512
+
+def _atoms(e, out):
+    if isinstance(e, Var): out.append(e.atom)
+    elif isinstance(e, (Tensor, Par)):
+        for c in e.children(): _atoms(c, out)
+    return out
+
+def formula_template(e, edge_dir):
+    """Returns the arrays of :func:`formula_arrays` for e laid out from row 0, as
+    tuples. They are kept for the last TEMPLATE_CACHE_SIZE formulas (equal
+    ones sharing an entry), so a formula that comes up again is not laid out
+    again. Hits and misses are counted in stats."""
+    key = (edge_dir, str(e), tuple(_atoms(e, [])))
+    t = _templates.get(key)
+    if t is not None:
+        stats['template_hits'] += 1
+        _templates.move_to_end(key)
+        return t
+    stats['template_misses'] += 1
+    arrays = formula_arrays(e, edge_dir)
+    t = tuple(tuple(a) for a in arrays[:-1]) + (arrays[-1],)
+    _templates[key] = t
+    if len(_templates) > TEMPLATE_CACHE_SIZE: _templates.popitem(last=False)
+    return t
+
+def clear_templates():
+    _templates.clear()
 
-def knuth_tree_layout(e, g, row, min_pos, parent_v, edge_dir):
-    if (isinstance(e, Unit)): return min_pos, parent_v, row
-    row += math.ceil(len(str(e)) / 6)
-    v = g.add_vertex(row=row)
+def _arrays_at(e, edge_dir, row, atomic):
+    """The arrays of :func:`formula_arrays`, from the template of e shifted down to
+    row unless some subformulas are atomic."""
+    if atomic: return formula_arrays(e, edge_dir, row, atomic)
+    types, rows, positions, edges, edata, arcs, max_r = formula_template(e, edge_dir)
+    if row: rows = [r + row for r in rows]
+    return types, rows, positions, edges, edata, arcs, max_r + row
+
+def knuth_tree_layout(e, row, min_pos, parent_v, edge_dir, arrays, lens, atomic=None):
+    if (isinstance(e, Unit)): return min_pos, row
+    types, rows, positions, edges, edata, arcs = arrays
+    row += math.ceil(str_len(e, lens) / 6)
+    v = len(types)
+    types.append(0)
+    rows.append(row)
+    positions.append(min_pos)
 
     ch = []
-    if isinstance(e, Tensor):
-        g.set_type(v, 1)
+    if atomic and id(e) in atomic:
+        pass
+    elif isinstance(e, Tensor):
+        types[v] = 1
         ch = e.children()
     elif isinstance(e, Par):
-        g.set_type(v, 2)
+        types[v] = 2
         ch = e.children()
     
     # elif isinstance(e, Var):
@@ -61,113 +125,414 @@ def knuth_tree_layout(e, g, row, min_pos, parent_v, edge_dir):
     #         edge_dir *= -1
 
     if edge_dir == 1:
-        g.add_edge(parent_v, v, data = e)
+        edges.append((parent_v, v))
     elif edge_dir == -1:
-        g.add_edge(v, parent_v, data = e)
+        edges.append((v, parent_v))
+    edata.append(e)
 
-    max_v = v
     max_r = row
     pos = min_pos
     if len(ch) > 0:
+        ces = []
         for c in ch:
-            pos, max_v0, max_r0 = knuth_tree_layout(c, g, row, pos, v, edge_dir)
-            max_v = max(max_v0, max_v)
+            if not isinstance(c, Unit): ces.append(len(edges))
+            pos, max_r0 = knuth_tree_layout(c, row, pos, v, edge_dir, arrays, lens, atomic)
             max_r = max(max_r0, max_r)
             pos += 1
         pos -= 1
 
-    g.set_position(v, (min_pos + pos) / 2)
-    return pos, max_v, max_r
+        # arcs go between the premises of a tensor in the decomposition
+        # and a par in the composition
+        if types[v] == (1 if edge_dir == 1 else 2) and len(ces) > 1:
+            arcs.append((v, ces))
 
+    positions[v] = (min_pos + pos) / 2
+    return pos, max_r
 
-def fuse_var(g):
+def str_len(e, lens=None):
+    """Returns len(str(e)) without building the string. The optional dict
+    lens memoises lengths of subformulas by id."""
+    if lens is None: lens = dict()
+    l = lens.get(id(e))
+    if l is None:
+        if isinstance(e, Var):
+            l = len(e.name) + (1 if e.dual else 0)
+        elif isinstance(e, Unit):
+            l = 1
+        else:
+            ch = e.children()
+            l = 3 * (len(ch) - 1) if ch else 0
+            for c in ch:
+                l += str_len(c, lens) + (0 if isinstance(c, Var) else 2)
+        lens[id(e)] = l
+    return l
+
+
+def _leaf_ends(g, e):
+    """Returns whether e starts at an input leaf and whether it ends at an output leaf."""
+    s,t = g.edge_st(e)
+    inp = g.type(s) == 0 and len(g.in_edges(s)) == 0
+    outp = g.type(t) == 0 and len(g.out_edges(t)) == 0
+    return inp, outp
+
+def _fusible(g, e, d, inp, outp):
+    """Variable edges at a leaf can be fused, and so can edges carrying compound
+    formulas at a labelled leaf, as made by decompose and compose with atomic."""
+    if not (inp or outp): return False
+    if isinstance(d, Var): return True
+    if d is None or isinstance(d, Unit): return False
+    s,t = g.edge_st(e)
+    return g.vdata(t if outp else s) is not None
+
+def _fusion_case(g, d, inp0, outp0, e1):
+    """Returns how the leaf edge e1 can be fused with a leaf edge carrying d with
+    the given ends: 1 or 2 for equal formulas, where the first or the second edge
+    ends at the output leaf, 3 for dual formulas at two outputs, 4 for dual
+    formulas at two inputs, and 0 if they can't be fused."""
+    inp1, outp1 = _leaf_ends(g, e1)
+    if not (inp1 or outp1): return 0
+    d1 = g.edata(e1)
+    if d1 == d:
+        if outp0 and inp1: return 1
+        elif outp1 and inp0: return 2
+    elif d1 == ~d:
+        if outp0 and outp1: return 3
+        elif inp0 and inp1: return 4
+    return 0
+
+def _fuse(g, e0, e1, case):
+    """Fuses the leaf edges e0 and e1 in place, as given by :func:`_fusion_case`.
+    Returns the labels of the two leaves."""
+    d = g.edata(e0)
+    s0,t0 = g.edge_st(e0)
+    s1,t1 = g.edge_st(e1)
+    if case == 1:
+        e2 = g.add_edge(s0,t1,data=d)
+        g.copy_arcs(e0, e2)
+        g.copy_arcs(e1, e2)
+        labels = (g.vdata(t0), g.vdata(s1))
+        g.remove_vertices([t0,s1])
+    elif case == 2:
+        e2 = g.add_edge(s1,t0,data=d)
+        g.copy_arcs(e0, e2)
+        g.copy_arcs(e1, e2)
+        labels = (g.vdata(s0), g.vdata(t1))
+        g.remove_vertices([t1,s0])
+    elif case == 3:
+        e2 = g.add_edge(s0,t1,data=d)
+        g.copy_arcs(e0, e2)
+        g.set_type(t1, 3)
+        labels = (g.vdata(t0), g.vdata(t1))
+        g.remove_vertices([t0])
+    else:
+        e2 = g.add_edge(s1,t0,data=d)
+        g.copy_arcs(e0, e2)
+        g.set_type(s1, 3)
+        labels = (g.vdata(s0), g.vdata(s1))
+        g.remove_vertices([s0])
+    return labels
+
+def _fusions(g, order='first'):
+    """Generates pairs (g1, labels) for the ways of fusing one variable edge with
+    each of its partners, where labels are the labels of the fused leaves. The
+    edge is the first one that has any partners if order is 'first', or the
+    first one with the fewest partners if order is 'fewest', which keeps the
+    search tree narrow near the root."""
     g = g.copy()
-    fusions = []
+    best = None
     for e0 in g.edges():
+        d = g.edata(e0)
+        inp0, outp0 = _leaf_ends(g, e0)
+        if not _fusible(g, e0, d, inp0, outp0): continue
+
+        partners = []
+        for e1 in g.edges():
+            case = _fusion_case(g, d, inp0, outp0, e1)
+            if case: partners.append((e1, case))
+        if partners and (best is None or len(partners) < len(best[1])):
+            best = (e0, partners)
+            if order == 'first' or len(partners) == 1: break
+    if best is None: return
+    e0, partners = best
+    for e1, case in partners:
+        g1 = g.copy()
+        labels = _fuse(g1, e0, e1, case)
+        yield g1, labels
+
+def fuse_var(g):
+    """Generates the graphs obtained by fusing the first variable edge that can be
+    fused with any of its partners. The graphs are built one at a time as they
+    are requested."""
+    for g1, _ in _fusions(g):
+        yield g1
+
+def fuse_links(g, links):
+    """Returns a copy of g where the leaves given by each pair of labels in links
+    are fused, or None if some pair can't be fused."""
+    g = g.copy()
+    leaves = dict()
+    for v in g.vertices():
+        l = g.vdata(v)
+        if l is not None and g.type(v) == 0: leaves[l] = v
+    for a,b in links:
+        if a not in leaves or b not in leaves: return None
+        e0 = next(iter(g.incident_edges(leaves.pop(a))))
+        e1 = next(iter(g.incident_edges(leaves.pop(b))))
+        for e0,e1 in ((e0,e1), (e1,e0)):
+            d = g.edata(e0)
+            inp0, outp0 = _leaf_ends(g, e0)
+            if not _fusible(g, e0, d, inp0, outp0): continue
+            case = _fusion_case(g, d, inp0, outp0, e1)
+            if case:
+                _fuse(g, e0, e1, case)
+                break
+        else: return None
+    return g
+
+
+def _lone_roots(g):
+    """Returns the unlabelled boundary leaves of g at a lone variable."""
+    roots = []
+    for v in chain(g.inputs, g.outputs):
+        if g.type(v) != 0 or g.vdata(v) is not None: continue
+        es = g.incident_edges(v)
+        if len(es) == 1 and isinstance(g.edata(next(iter(es))), Var): roots.append(v)
+    return roots
+
+def _fuse_leaves(g, v0, v1):
+    """Fuses the edges at the leaves v0 and v1 in place, joining them at those two
+    ends. Returns False if they can't be fused."""
+    for x0, x1 in ((v0, v1), (v1, v0)):
+        e0 = next(iter(g.incident_edges(x0)))
+        e1 = next(iter(g.incident_edges(x1)))
         d = g.edata(e0)
         s0,t0 = g.edge_st(e0)
+        inp0, outp0 = _leaf_ends(g, e0)
+        inp0, outp0 = inp0 and x0 == s0, outp0 and x0 == t0
+        if not _fusible(g, e0, d, inp0, outp0): continue
+        case = _fusion_case(g, d, inp0, outp0, e1)
+        if case and x1 == g.edge_st(e1)[0 if case in (1, 4) else 1]:
+            _fuse(g, e0, e1, case)
+            return True
+    return False
 
-        inp0 = g.type(s0) == 0 and len(g.in_edges(s0)) == 0
-        outp0 = g.type(t0) == 0 and len(g.out_edges(t0)) == 0
+def _leaf_table(g):
+    return dict((g.vdata(v), v) for v in g.vertices()
+                if g.type(v) == 0 and g.vdata(v) is not None)
 
-        if not (isinstance(d, Var) and (inp0 or outp0)):
+def _fused_readings(g, links):
+    """Generates the graphs obtained from g by fusing the leaves given by links in
+    place, as :func:`fuse_links`, except that None stands for the root of a lone
+    variable. Where that could be more than one root, each is tried on a copy."""
+    leaves = _leaf_table(g)
+    def ends(g, leaves, l):
+        # a labelled leaf may be gone if a root was read as its own partner
+        if l is None: return _lone_roots(g)
+        return [leaves[l]] if leaves[l] in g.vertices() else []
+    for i, (a,b) in enumerate(links):
+        vs0, vs1 = ends(g, leaves, a), ends(g, leaves, b)
+        pairs = [(j, k) for j in range(len(vs0)) for k in range(len(vs1)) if vs0[j] != vs1[k]]
+        if len(pairs) < 2:
+            if not pairs or not _fuse_leaves(g, vs0[pairs[0][0]], vs1[pairs[0][1]]): return
             continue
-            
-        for e1 in g.edges():
-            s1,t1 = g.edge_st(e1)
-
-            inp1 = g.type(s1) == 0 and len(g.in_edges(s1)) == 0
-            outp1 = g.type(t1) == 0 and len(g.out_edges(t1)) == 0
-
-            if not (inp1 or outp1): continue
-            
-            if g.edata(e1) == d:
-                if outp0 and inp1:
-                    g1 = g.copy()
-                    e2 = g1.add_edge(s0,t1,data=d)
-                    g1.copy_arcs(e0, e2)
-                    g1.copy_arcs(e1, e2)
-                    g1.remove_vertices([t0,s1])
-                    fusions.append(g1)
-                elif outp1 and inp0:
-                    g1 = g.copy()
-                    e2 = g1.add_edge(s1,t0,data=d)
-                    g1.copy_arcs(e0, e2)
-                    g1.copy_arcs(e1, e2)
-                    g1.remove_vertices([t1,s0])
-                    fusions.append(g1)
-            elif g.edata(e1) == ~d:
-                if outp0 and outp1:
-                    g1 = g.copy()
-                    e2 = g1.add_edge(s0,t1,data=d)
-                    g1.copy_arcs(e0, e2)
-                    g1.set_type(t1, 3)
-                    g1.remove_vertices([t0])
-                    fusions.append(g1)
-                elif inp0 and inp1:
-                    g1 = g.copy()
-                    e2 = g1.add_edge(s1,t0,data=d)
-                    g1.copy_arcs(e0, e2)
-                    g1.set_type(s1, 3)
-                    g1.remove_vertices([s0])
-                    fusions.append(g1)
-        if fusions != []: break
-            
-            # if g.type(s1) == 0 and len(g.in_edges(s1)) == 0:
-            #     g.add_edge(s0,t1,data=d)
-            #     g.remove_vertices([t0,s1])
-            #     return d
-    return fusions
-
+        for j, k in pairs:
+            # copying renumbers the vertices, so find the ends again
+            g1 = g.copy()
+            leaves1 = _leaf_table(g1)
+            if _fuse_leaves(g1, ends(g1, leaves1, a)[j], ends(g1, leaves1, b)[k]):
+                yield from _fused_readings(g1, links[i+1:])
+        return
+    yield g
 
 def switchings(g):
-    sw = []
-
-    def rec(g1):
-        g1 = g1.copy() # to normalise edge names
-        for v in g1.vertices():
-            ie = g1.in_edges(v)
-            oe = g1.out_edges(v)
-            if len(ie) > 1 and g1.type(v) == 2:
-                    for e in ie:
-                        g2 = g1.copy()
-                        for e1 in ie:
-                            if e1 != e and e1 in g2.edges():
-                                g2.remove_edge(e1)
-                        rec(g2)
-                    return
-            elif len(oe) > 1 and g1.type(v) == 1:
-                    for e in oe:
-                        g2 = g1.copy()
-                        for e1 in oe:
-                            if e1 != e and e1 in g2.edges():
-                                g2.remove_edge(e1)
-                        rec(g2)
-                    return
-        sw.append(g1)
-
-    rec(g)
-    return sw
+    """Generates the switchings of g one at a time."""
+    g1 = g.copy() # to normalise edge names
+    for v in g1.vertices():
+        ie = g1.in_edges(v)
+        oe = g1.out_edges(v)
+        if len(ie) > 1 and g1.type(v) == 2:
+                for e in ie:
+                    g2 = g1.copy()
+                    for e1 in ie:
+                        if e1 != e and e1 in g2.edges():
+                            g2.remove_edge(e1)
+                    yield from switchings(g2)
+                return
+        elif len(oe) > 1 and g1.type(v) == 1:
+                for e in oe:
+                    g2 = g1.copy()
+                    for e1 in oe:
+                        if e1 != e and e1 in g2.edges():
+                            g2.remove_edge(e1)
+                    yield from switchings(g2)
+                return
+    yield g1
+
+def switching_arrays(g):
+    """Encodes the switchings of g as arrays. Returns (n, fixed, edges, choices),
+    where the vertices are numbered 0..n-1, fixed has the (s, t) of the edges in
+    every switching, edges those of the premises of tensors and pars, and
+    choices the indices in edges of the premises of each of them."""
+    index = dict((v, i) for i, v in enumerate(g.vertices()))
+    switched = dict()
+    choices = []
+    for v in g.vertices():
+        if g.type(v) == 2: es = g.in_edges(v)
+        elif g.type(v) == 1: es = g.out_edges(v)
+        else: continue
+        if len(es) > 1:
+            choices.append([switched.setdefault(e, len(switched)) for e in es])
+    edges = [None] * len(switched)
+    for e, i in switched.items(): edges[i] = (index[g.edge_s(e)], index[g.edge_t(e)])
+    fixed = [(index[g.edge_s(e)], index[g.edge_t(e)]) for e in g.edges() if e not in switched]
+    return len(index), fixed, edges, choices
+
+def switching_masks(num_edges, choices):
+    """Generates the lists of indices of switched edges kept by each switching, in
+    the same order as :func:`switchings`. A tensor or par that has lost all but
+    one premise to an earlier choice is not switched."""
+    def rec(j, removed):
+        while j < len(choices):
+            rest = [e for e in choices[j] if e not in removed]
+            if len(rest) > 1: break
+            j += 1
+        else:
+            yield [e for e in range(num_edges) if e not in removed]
+            return
+        for e in rest:
+            yield from rec(j + 1, removed.union(e1 for e1 in rest if e1 != e))
+    return rec(0, frozenset())
+
+def _find(parent, v):
+    while parent[v] != v:
+        parent[v] = parent[parent[v]]
+        v = parent[v]
+    return v
+
+def _contract(n, fixed, edges):
+    """Merges the vertices joined by fixed edges. Returns (m, edges) with the
+    ends of edges renumbered by the m components, or None if the fixed edges
+    have a cycle."""
+    parent = list(range(n))
+    for s,t in fixed:
+        s, t = _find(parent, s), _find(parent, t)
+        if s == t: return None
+        parent[s] = t
+    comp = dict()
+    for v in range(n): comp.setdefault(_find(parent, v), len(comp))
+    return len(comp), [(comp[_find(parent, s)], comp[_find(parent, t)]) for s,t in edges]
+
+def _acyclic_switchings_py(m, edges, masks):
+    for kept in masks:
+        parent = list(range(m))
+        for e in kept:
+            s, t = _find(parent, edges[e][0]), _find(parent, edges[e][1])
+            if s == t: return False
+            parent[s] = t
+    return True
+
+def _acyclic_batch_np(m, ends, mask):
+    rows = np.arange(len(mask))
+    parent = np.tile(np.arange(m, dtype=np.int64), (len(mask), 1))
+    # union-find over every switching in the batch at once, one edge at a time
+    for e, (s, t) in enumerate(ends):
+        add = mask[:, e]
+        if not add.any(): continue
+        roots = []
+        for v in (np.full(len(mask), s), np.full(len(mask), t)):
+            while True:
+                p = parent[rows, v]
+                if (p == v).all(): break
+                v = p
+            roots.append(v)
+        if (add & (roots[0] == roots[1])).any(): return False
+        parent[rows[add], roots[0][add]] = roots[1][add]
+    return True
+
+def _acyclic_switchings_np(m, edges, masks, size):
+    batch = []
+    for kept in masks:
+        batch.append(kept)
+        if len(batch) == size:
+            mask = np.zeros((len(batch), len(edges)), dtype=bool)
+            for r, es in enumerate(batch): mask[r, es] = True
+            if not _acyclic_batch_np(m, edges, mask): return False
+            batch = []
+    # for a few switchings numpy costs more than it saves
+    return _acyclic_switchings_py(m, edges, batch)
+
+def _acyclic_product_np(m, edges, choices, size):
+    """As _acyclic_switchings_np, for when no edge is a premise of two tensors or
+    pars, so the switchings are all combinations of choices and are numbered
+    in mixed radix."""
+    sizes = np.array([len(c) for c in choices], dtype=np.int64)
+    strides = np.ones(len(choices), dtype=np.int64)
+    for j in range(len(choices) - 2, -1, -1): strides[j] = strides[j+1] * sizes[j+1]
+    width = int(sizes.max())
+    premises = np.zeros((len(choices), width), dtype=np.int64)
+    for j, c in enumerate(choices): premises[j, :len(c)] = c
+
+    total = 1
+    for n in sizes: total *= int(n)
+    for start in range(0, total, size):
+        idx = np.arange(start, min(start + size, total), dtype=np.int64)
+        pick = (idx[:, None] // strides) % sizes
+        mask = np.zeros((len(idx), len(edges)), dtype=bool)
+        rows = np.arange(len(idx))
+        for j in range(len(choices)): mask[rows, premises[j, pick[:, j]]] = True
+        if not _acyclic_batch_np(m, edges, mask): return False
+    return True
+
+def switching_acyclic(g, batch=4096):
+    """Returns True if every switching of g is acyclic. The net is encoded once by
+    :func:`switching_arrays` and the edges all switchings share are merged.
+    The switchings are then run through union-find in batches of the given size
+    with numpy, or one at a time if numpy is not installed."""
+    n, fixed, edges, choices = switching_arrays(g)
+    c = _contract(n, fixed, edges)
+    if c is None: return False
+    m, edges = c
+    if np is None:
+        return _acyclic_switchings_py(m, edges, switching_masks(len(edges), choices))
+    total = 1
+    for ch in choices: total *= len(ch)
+    if total < 256:
+        return _acyclic_switchings_py(m, edges, switching_masks(len(edges), choices))
+    # switchings are numbered by int64
+    if sum(len(ch) for ch in choices) == len(edges) and total < 2**62:
+        return _acyclic_product_np(m, edges, choices, batch)
+    return _acyclic_switchings_np(m, edges, switching_masks(len(edges), choices), batch)
+
+def sample_switchings(g, k, rng=random):
+    """Tests k random switchings of g for acyclicity, in time linear in the size
+    of g for each. Returns False if one of them has a cycle, so g fails the
+    switching checker, and True if g may pass it."""
+    n, fixed, edges, choices = switching_arrays(g)
+    c = _contract(n, fixed, edges)
+    if c is None: return False
+    m, edges = c
+    for _ in range(k):
+        removed = set()
+        for ch in choices:
+            rest = [e for e in ch if e not in removed]
+            if len(rest) > 1:
+                keep = rng.choice(rest)
+                removed.update(e for e in rest if e != keep)
+        if not _acyclic_switchings_py(m, edges, [[e for e in range(len(edges)) if e not in removed]]):
+            return False
+    return True
+
+def sampling_checker(checker, samples, rng=random):
+    """Returns a checker that rejects nets with a cyclic switching among the given
+    number of random ones before running checker. Rejections are counted in
+    stats. Only sound for checkers that reject all such nets, see SAMPLED."""
+    def check(g):
+        stats['sample_checks'] += 1
+        if not sample_switchings(g, samples, rng):
+            stats['sample_rejected'] += 1
+            return False
+        return checker(g)
+    return check
 
 def decompose_root(g):
     g1 = g.copy()
@@ -253,7 +618,7 @@ def hocc_cut_checker(g):
     return len(g.vertices()) == 0
 
 def switching_checker(g):
-    return all(s.is_acyclic() for s in switchings(g))
+    return switching_acyclic(g)
 
 def contraction_checker(g):
     g1 = g.copy()
@@ -261,29 +626,651 @@ def contraction_checker(g):
         pass
     return g1.is_point()
 
+# checkers by name, e.g. for command line and service options
+CHECKERS = {
+    'cut': cut_checker,
+    'switching': switching_checker,
+    'contraction': contraction_checker,
+    'hocc': hocc_cut_checker,
+    'decompose': decompose_checker,
+}
+
+def euler_condition(g):
+    """A necessary condition for every switching of g to be acyclic, in linear
+    time. The switching keeping a premise of each tensor and par that no other
+    one has as a premise, where there is one, may have at most as many edges
+    as there are vertices less the components of g."""
+    n, fixed, edges, choices = switching_arrays(g)
+    parent = list(range(n))
+    comps = n
+    for s,t in chain(fixed, edges):
+        s, t = _find(parent, s), _find(parent, t)
+        if s != t:
+            parent[s] = t
+            comps -= 1
+    shared = Counter(e for ch in choices for e in ch)
+    kept = sum(1 for ch in choices if any(shared[e] == 1 for e in ch))
+    return len(fixed) + kept <= n - comps
+
+def first_switching_condition(g):
+    """A necessary condition for every switching of g to be acyclic, in linear
+    time: the one keeping the first premise of each tensor and par is."""
+    n, fixed, edges, choices = switching_arrays(g)
+    c = _contract(n, fixed, edges)
+    if c is None: return False
+    m, edges = c
+    return _acyclic_switchings_py(m, edges, [next(switching_masks(len(edges), choices))])
+
+class CheckerPipeline(object):
+    """A checker that runs cheap necessary conditions on a net in turn, and checker
+    only on the nets that pass all of them. By default the conditions are
+    euler_condition and first_switching_condition if checker is one of
+    SAMPLED, which they hold for, and none otherwise, since other checkers
+    accept nets with cyclic switchings. How many nets each stage was called
+    on, how many it rejected and the time it took are kept in calls, rejected
+    and time, keyed by the name of the stage."""
+    def __init__(self, checker, conditions=None):
+        if conditions is None:
+            conditions = ((euler_condition, first_switching_condition)
+                          if _base(checker) in SAMPLED else ())
+        self.checker = checker
+        self.stages = [(getattr(f, '__name__', type(f).__name__), f)
+                       for f in list(conditions) + [checker]]
+        self.calls = Counter()
+        self.rejected = Counter()
+        self.time = Counter()
+
+    def __call__(self, g):
+        for name, f in self.stages:
+            self.calls[name] += 1
+            t = time.perf_counter()
+            ok = f(g)
+            self.time[name] += time.perf_counter() - t
+            if not ok:
+                self.rejected[name] += 1
+                return False
+        return True
+
+    def rates(self):
+        """Returns the fraction of the nets reaching each stage that it rejected."""
+        return dict((name, self.rejected[name] / self.calls[name] if self.calls[name] else 0.0)
+                    for name, _ in self.stages)
+
+    def reset(self):
+        self.calls.clear()
+        self.rejected.clear()
+        self.time.clear()
+
+def _base(checker):
+    """The checker a pipeline ends with, or the checker itself."""
+    return checker.checker if isinstance(checker, CheckerPipeline) else checker
+
+def _connective_type(d):
+    if isinstance(d, Tensor): return 1
+    elif isinstance(d, Par): return 2
+    else: return 0
+
+def _is_cut(g, e):
+    """An edge is a cut if it goes from the conclusion of a connective to the
+    premise of the same connective, or from an axiom (cap) straight into a
+    cut with another axiom (cup)."""
+    s,t = g.edge_st(e)
+    ty = _connective_type(g.edata(e))
+    if ty:
+        return (g.type(s) == ty and g.type(t) == ty and
+                len(g.out_edges(s)) == 1 and len(g.in_edges(t)) == 1)
+    return (g.type(s) == 3 and g.type(t) == 3 and
+            len(g.out_edges(s)) == 2 and len(g.in_edges(t)) == 2)
+
+def find_cuts(g):
+    """Returns the cuts in g, e.g. as produced by :meth:`Graph.compose`."""
+    return [e for e in g.edges() if _is_cut(g, e)]
+
+def _tensor_par_step(g, c):
+    u,w = g.edge_st(c)
+    ins = sorted(g.in_edges(u))
+    outs = sorted(g.out_edges(w))
+    if len(ins) != len(outs): return None
+
+    # premises are matched by formula, and identical premises in order of edge
+    # id, since the graph does not record the order of the children
+    pairs = []
+    for a in ins:
+        d = g.edata(a)
+        for i,b in enumerate(outs):
+            if g.edata(b) == d:
+                pairs.append((a, outs.pop(i)))
+                break
+        else: return None
+
+    es = []
+    for a,b in pairs:
+        e = g.add_edge(g.edge_s(a), g.edge_t(b), g.edata(a))
+        g.copy_arcs(a, e)
+        g.copy_arcs(b, e)
+        es.append(e)
+    g.remove_vertices([u, w])
+    return es
+
+def _axiom_step(g, c):
+    x,y = g.edge_st(c)
+    b = next(e for e in g.out_edges(x) if e != c)
+    a = next(e for e in g.in_edges(y) if e != c)
+    if a == b: # a closed loop
+        g.remove_vertices([x, y])
+        return []
+    e = g.add_edge(g.edge_s(a), g.edge_t(b), g.edata(a))
+    g.copy_arcs(a, e)
+    g.copy_arcs(b, e)
+    g.remove_vertices([x, y])
+    return [e]
+
+def normalise(g, cuts=None):
+    """Eliminates the cuts in g in place and returns g. The cuts are the edges
+    returned by :meth:`Graph.compose`, or found by :func:`find_cuts` if not given.
+    A cut between a tensor and a par is replaced by cuts between their premises,
+    and a cut between two axioms by a single edge. The graph doesn't record the
+    order of premises, so identical premises of the tensor and the par are
+    paired in order of edge id. Each step removes two vertices and only looks
+    at the new edges it creates, so the work is linear in the number of cuts."""
+    work = list(find_cuts(g) if cuts is None else cuts)
+    while work:
+        c = work.pop()
+        if c not in g.edges() or not _is_cut(g, c): continue
+        if _connective_type(g.edata(c)):
+            es = _tensor_par_step(g, c)
+        else:
+            es = _axiom_step(g, c)
+        if es: work.extend(es)
+    return g
+
+def compose_proofs(g1, g2):
+    """Composes a proof net of A |- B with a proof net of B |- C and normalises the
+    result to a cut-free proof net of A |- C.
+
+    Where B is a variable, the search may have fused it with itself, which
+    removes it and leaves the net with no boundary vertex for it. Composing
+    with such a net leaves B unlinked in the other net, and a net with no
+    vertices at all (as found for B |- B) composes as the identity. When some
+    variable occurs more often with one polarity than the other, the search
+    may also link B at its boundary vertex, and then there is nothing to
+    compose along and ValueError is raised.
+
+    Identical premises of a connective are matched in order of edge id (see
+    :func:`normalise`), so they may be paired crosswise compared with the
+    source nets. That gives another proof net of A |- C."""
+    if g1.num_vertices() == 0: return g2.copy()
+    if g2.num_vertices() == 0: return g1.copy()
+    g = g1.copy()
+    if not g1.outputs and g2.inputs:
+        g2 = g2.copy()
+        g2.inputs = []
+    elif g1.outputs and not g2.inputs:
+        g.outputs = []
+    cuts = g.compose(g2)
+    return normalise(g, cuts)
+
 def copy_boundary(g):
     pass
 
 
-def prove(exp0, exp1, checker=None):
+def _dfs(g, checker, links=(), limit=None, pruned=None, order='first'):
+    """Depth-first search over the ways of fusing the variables of g, with an
+    explicit stack holding one graph and one generator of fusions per level.
+    If limit is given, branches taking another choice than the first more than
+    limit times are cut off (setting pruned[0]), and only leaves with exactly
+    limit such choices are yielded."""
+    # each entry is [graph, links, fusions, is leaf, discrepancies, choices taken]
+    stack = [[g, links, _fusions(g, order), True, 0, 0]]
+    while stack:
+        top = stack[-1]
+        child = next(top[2], None)
+        if child is None:
+            stack.pop()
+            if top[3] and (limit is None or top[4] == limit) and checker(top[0]):
+                yield top[0], top[1]
+            continue
+        top[3] = False
+        d = top[4] + (1 if top[5] else 0)
+        top[5] += 1
+        if limit is not None and d > limit:
+            # the remaining choices are all over the limit as well
+            pruned[0] = True
+            top[2] = iter(())
+            continue
+        f, labels = child
+        stack.append([f, top[1] + (labels,), _fusions(f, order), True, d, 0])
+
+def _ids(g, checker, links=(), order='first'):
+    """Iterative deepening on the number of choices that differ from the first
+    one (limited discrepancy search), so linkings close to the one depth-first
+    search tries first are found without going down its whole tree."""
+    k = 0
+    while True:
+        pruned = [False]
+        yield from _dfs(g, checker, links, k, pruned, order)
+        if not pruned[0]: return
+        k += 1
+
+def link_spread(g):
+    """Returns a score function for best-first search, which sums the distances
+    between linked leaves, measured as fractions of the width of their formulas.
+    It favours linkings that keep variables in the same order."""
+    sizes = [0, 0]
+    for v in g.vertices():
+        l = g.vdata(v)
+        if l is not None: sizes[l[0]] = max(sizes[l[0]], l[1] + 1)
+    def score(g1, links):
+        return sum(abs(a[1] / sizes[a[0]] - b[1] / sizes[b[0]])
+                   for a,b in links if a is not None and b is not None)
+    return score
+
+def _best_first(g, checker, links=(), max_frontier=None, score=None, order='first'):
+    """Best-first search by score (lowest first, deepest first on ties). If more
+    than max_frontier graphs are waiting to be expanded, the remaining ones are
+    searched depth-first in order, so memory stops growing."""
+    if score is None: score = link_spread(g)
+    count = 0
+    heap = [(score(g, links), -len(links), count, g, links)]
+    while heap:
+        if max_frontier is not None and len(heap) > max_frontier:
+            while heap:
+                _, _, _, g1, l1 = heapq.heappop(heap)
+                yield from _dfs(g1, checker, l1, order=order)
+            return
+        _, _, _, g1, l1 = heapq.heappop(heap)
+        leaf = True
+        for f, labels in _fusions(g1, order):
+            leaf = False
+            l2 = l1 + (labels,)
+            count += 1
+            heapq.heappush(heap, (score(f, l2), -len(l2), count, f, l2))
+        if leaf and checker(g1):
+            yield g1, l1
+
+def search(g, checker, links=(), strategy='dfs', max_frontier=None, score=None, order='first'):
+    """Searches the ways of fusing the variables of g, yielding a pair (g1, links)
+    for every fully fused graph g1 accepted by checker, where links are the pairs
+    of leaf labels fused along the way (after the given links).
+
+    The strategy is one of 'dfs' (depth-first), 'ids' (iterative deepening on
+    the number of choices that differ from depth-first order) or 'best'
+    (best-first by score, by default :func:`link_spread`). Depth-first search
+    only keeps the graphs on the current path. For best-first search,
+    max_frontier bounds the number of graphs kept, after which it falls back to
+    depth-first search. The order in which variables are fused is 'first' or
+    'fewest', see :func:`_fusions`. Unless g is :func:`_balanced`, which leaves
+    are left unlinked depends on the order, so there 'first' is always used."""
+    if order not in ('first', 'fewest'): raise ValueError("Unknown fusion order: " + str(order))
+    if order == 'fewest' and not _balanced(g): order = 'first'
+    if strategy == 'dfs': return _dfs(g, checker, links, order=order)
+    elif strategy == 'ids': return _ids(g, checker, links, order)
+    elif strategy == 'best': return _best_first(g, checker, links, max_frontier, score, order)
+    else: raise ValueError("Unknown search strategy: " + str(strategy))
+
+# counts of how often prove() was cut short by the prefilter, by reason
+stats = Counter()
+
+def prefilter(exp0, exp1):
+    """Looks for a reason why exp0 |- exp1 has no proof net that passes the
+    switching or cut checker, using only the formulas. Returns the reason, or
+    None if the sequent may be provable.
+
+    Every fusion of two leaves adds one to (edges - vertices) of the graph,
+    which starts at minus the number of formulas, and a switching drops
+    (premises - 1) edges at each tensor of exp0 and par of exp1. An acyclic
+    switching needs fewer edges than vertices, so there must be more formulas
+    plus dropped edges than fusions, and the number of fusions is fixed: every
+    name is linked as often as it occurs with the less frequent polarity."""
+    if isinstance(exp0, Var) or isinstance(exp1, Var): return None
+    trees = 0
+    switched = 0
+    occ = dict()
+    for side, e in ((0, exp0), (1, exp1)):
+        if isinstance(e, Unit): continue
+        trees += 1
+        stack = [e]
+        while stack:
+            x = stack.pop()
+            if isinstance(x, Var):
+                n = occ.setdefault(x.name, [0, 0])
+                n[(side == 1) != x.dual] += 1
+            elif isinstance(x, (Tensor, Par)):
+                ch = [c for c in x.children() if not isinstance(c, Unit)]
+                if len(ch) > 1 and isinstance(x, Tensor if side == 0 else Par):
+                    switched += len(ch) - 1
+                stack.extend(ch)
+    if trees == 0: return None
+    fusions = sum(min(n) for n in occ.values())
+    if trees + switched - fusions <= 0:
+        return ("every switching has a cycle: {} links but only {} formulas and {} "
+                "switched premises".format(fusions, trees, switched))
+    return None
+
+def forced_links(exp0, exp1):
+    """Returns the pairs of leaf labels (see :func:`decompose`) that every proof net
+    of exp0 |- exp1 links, namely those of the names that occur exactly once
+    with each polarity."""
+    if isinstance(exp0, Var) or isinstance(exp1, Var): return []
+    occ = dict()
+    for side, e in ((0, exp0), (1, exp1)):
+        k = 0
+        stack = [e]
+        while stack:
+            x = stack.pop()
+            if isinstance(x, Var):
+                occ.setdefault(x.name, []).append(((side == 1) != x.dual, (side, k)))
+                k += 1
+            elif isinstance(x, (Tensor, Par)):
+                stack.extend(reversed(x.children()))
+    return [(ls[0][1], ls[1][1]) for ls in occ.values()
+            if len(ls) == 2 and ls[0][0] != ls[1][0]]
+
+def balanced(exp0, exp1):
+    """Returns whether every name occurs as often with each polarity in exp0 |- exp1
+    (and neither side is a lone variable, whose root can be fused as well). Then
+    every leaf is linked in every net the search finds, so the order in which
+    leaves are linked doesn't change which nets there are."""
+    if isinstance(exp0, Var) or isinstance(exp1, Var): return False
+    count = Counter()
+    for side, e in ((0, exp0), (1, exp1)):
+        stack = [e]
+        while stack:
+            x = stack.pop()
+            if isinstance(x, Var):
+                count[x.name] += 1 if (side == 1) == x.dual else -1
+            elif isinstance(x, (Tensor, Par)):
+                stack.extend(x.children())
+    return not any(count.values())
+
+def _balanced(g):
+    """Returns whether the leaves of g that can be fused pair up as in
+    :func:`balanced`: there are as many leaves of each formula as of the ones
+    it can be fused with, and no edge is a leaf at both ends."""
+    count = Counter()
+    for e in g.edges():
+        d = g.edata(e)
+        inp, outp = _leaf_ends(g, e)
+        if not _fusible(g, e, d, inp, outp): continue
+        if inp and outp: return False
+        k, dual = (str(d), str(~d)) if outp else (str(~d), str(d))
+        count[min(k, dual)] += 1 if k < dual else -1
+    return not any(count.values())
+
+def _start(exp0, exp1, direct=True):
+    """Returns the graph the search for exp0 |- exp1 starts from, with the forced
+    links already fused if direct is set, and the links fused."""
+    g = sequent_graph(exp0, exp1)
+    links = tuple(forced_links(exp0, exp1)) if direct else ()
+    if links:
+        g1 = fuse_links(g, links)
+        if g1 is not None: return g1, links
+    return g, ()
+
+# checkers that only accept nets whose switchings are all acyclic
+SAMPLED = (cut_checker, switching_checker, decompose_checker)
+
+# checkers that accept a sequent whenever its independent components (see
+# components()) are accepted on their own, as with the MIX rule
+SEPARABLE = (cut_checker, switching_checker, hocc_cut_checker, decompose_checker)
+
+def _var_names(e, out):
+    if isinstance(e, Var): out.append(e.name)
+    elif isinstance(e, (Tensor, Par)):
+        for c in e.children(): _var_names(c, out)
+    return out
+
+def components(exp0, exp1):
+    """Splits exp0 |- exp1 into groups of parts with disjoint sets of names, where
+    the parts of exp0 are the factors of its outermost tensor and those of exp1
+    the summands of its outermost par. Returns a list of pairs (ps0, ps1) of
+    lists of part indices. Parts without variables are left out."""
+    parts = (exp0.children() if isinstance(exp0, Tensor) else [exp0],
+             exp1.children() if isinstance(exp1, Par) else [exp1])
+    parent = dict()
+    def find(p):
+        while parent[p] != p: p = parent[p]
+        return p
+    first = dict()
+    for side in (0, 1):
+        for i, e in enumerate(parts[side]):
+            names = _var_names(e, [])
+            if not names: continue
+            parent[(side, i)] = (side, i)
+            for n in names:
+                if n in first: parent[find((side, i))] = find(first[n])
+                else: first[n] = (side, i)
+    groups = dict()
+    for p in sorted(parent):
+        groups.setdefault(find(p), ([], []))[p[0]].append(p[1])
+    return list(groups.values())
+
+def _prove_components(exp0, exp1, checker, opts):
+    """Proves each group given by :func:`components` on its own and fuses the links
+    found into the graph of exp0 |- exp1. Returns (done, g), where done is False
+    if the sequent doesn't split or the combined net fails the checker."""
+    if isinstance(exp0, Var) or isinstance(exp1, Var): return False, None
+    groups = components(exp0, exp1)
+    if len(groups) < 2: return False, None
+    parts = (exp0.children() if isinstance(exp0, Tensor) else [exp0],
+             exp1.children() if isinstance(exp1, Par) else [exp1])
+    offsets = ([0], [0])
+    for side in (0, 1):
+        for e in parts[side]: offsets[side].append(offsets[side][-1] + len(_var_names(e, [])))
+
+    stats['components_split'] += 1
+    links = []
+    for grp in groups:
+        sub = []
+        # maps the leaf labels of the group's sequent to those of the whole
+        label = dict()
+        for side, join in ((0, Tensor), (1, Par)):
+            ps = [parts[side][i] for i in grp[side]]
+            sub.append(I if not ps else ps[0] if len(ps) == 1 else join(ps))
+            k = 0
+            for i in grp[side]:
+                for j in range(offsets[side][i], offsets[side][i+1]):
+                    label[(side, k)] = (side, j)
+                    k += 1
+        g, forced = _start(sub[0], sub[1])
+        # skip nets where a lone variable is fused with itself, which the
+        # whole sequent has no counterpart of
+        found = next((ls for _, ls in search(g, checker, forced, **opts)
+                      if all((a is None) == (b is None) for a,b in ls)), None)
+        if found is None:
+            # a lone variable is always fused with something, while in the whole
+            # sequent it may be left dangling, so only other groups are conclusive
+            if isinstance(sub[0], Var) or isinstance(sub[1], Var): return False, None
+            stats['components_failed'] += 1
+            return True, None
+        links.extend((label[a], label[b]) for a,b in found if a is not None)
+
+    g = fuse_links(sequent_graph(exp0, exp1), links)
+    if g is None or not checker(g): return False, None
+    return True, g
+
+def _rejected(exp0, exp1, checker):
+    """Runs the prefilter if checker is one it is sound for, counting the results
+    in stats."""
+    if _base(checker) not in (cut_checker, switching_checker): return False
+    stats['prefilter_calls'] += 1
+    if prefilter(exp0, exp1) is None: return False
+    stats['prefilter_rejected'] += 1
+    return True
+
+def sequent_graph(exp0, exp1, atomic=None):
+    """Returns the unfused graph of exp0 |- exp1, which the proof search starts from."""
+    g = Graph()
+    vs, row = decompose(exp0, g, atomic=atomic)
+    compose(exp1, g, row, atomic)
+    return g
+
+def _compound_strs(e, out):
+    if isinstance(e, (Tensor, Par)):
+        out.add(str(e))
+        for c in e.children(): _compound_strs(c, out)
+    return out
+
+def eta_atomic(exp0, exp1):
+    """Returns the ids of the outermost compound subformulas of exp0 and exp1 which
+    also occur on the other side, or dually on the same side. Linking these
+    directly, rather than their variables, gives eta-contracted proof nets."""
+    strs = (_compound_strs(exp0, set()), _compound_strs(exp1, set()))
+    atomic = set()
+    def rec(e, side):
+        if not isinstance(e, (Tensor, Par)): return
+        s = str(e)
+        if s in strs[1-side] or str(~e) in strs[side]:
+            atomic.add(id(e))
+        else:
+            for c in e.children(): rec(c, side)
+    rec(exp0, 0)
+    rec(exp1, 1)
+    return atomic
+
+def prove_all(exp0, exp1, checker=None, unique=False, strategy='dfs', max_frontier=None,
+              precheck=True, direct=True, order='first'):
+    """Generates the proof nets of exp0 |- exp1 as the search finds them. If unique
+    is set, nets isomorphic to one already generated are skipped. See :func:`search`
+    for strategy, max_frontier and order, and :func:`prove` for precheck and direct."""
     if checker == None:
         checker = cut_checker
-    g = Graph()
-    vs, row = decompose(exp0, g)
-    compose(exp1, g, row)
-
-    def rec(g1):
-        fusions = fuse_var(g1)
-        if fusions == []:
-            if checker(g1):
-                return g1
+    if precheck and _rejected(exp0, exp1, checker): return
+    g, links = _start(exp0, exp1, direct)
+
+    seen = set()
+    for g1, _ in search(g, checker, links, strategy=strategy, max_frontier=max_frontier,
+                        order=order):
+        if unique:
+            h = canonical_hash(g1)
+            if h in seen: continue
+            seen.add(h)
+        yield g1
+
+def count_proofs(exp0, exp1, checker=None, unique=False):
+    """Counts the proof nets of exp0 |- exp1. Only the graphs on the current
+    search path are kept in memory (plus one hash per net if unique is set)."""
+    return sum(1 for _ in prove_all(exp0, exp1, checker, unique))
+
+def prove(exp0, exp1, checker=None, lemmas=None, eta=False, strategy='dfs', max_frontier=None,
+          precheck=True, direct=True, split=True, samples=0, order='first'):
+    """Returns the first proof net of exp0 |- exp1 found, or None. If a
+    :class:`pypn.lemma.LemmaCache` is given as lemmas, the links of cached lemmas
+    and identities between subformulas are fused before searching for the rest,
+    and the linking found is added to the cache. The cached links are only used
+    for :func:`balanced` sequents, since elsewhere they may lead to a net with
+    other leaves left unlinked than any the plain search finds.
+
+    If eta is set, compound subformulas given by :func:`eta_atomic` are first
+    linked as a whole, which may give a much smaller net. If that fails, the
+    search continues with fully decomposed formulas. This is only done for
+    :func:`balanced` sequents, since elsewhere a leaf under a linked subformula
+    could be one the plain search leaves unlinked.
+
+    See :func:`search` for strategy, max_frontier and order.
+
+    If precheck is set and the checker is the cut or switching checker, sequents
+    rejected by :func:`prefilter` fail straight away. How often that happens is
+    counted in stats.
+
+    If direct is set, the links given by :func:`forced_links` are all fused in
+    one pass before the search, which is then only over the other names. When
+    every name is forced, the checker runs once on the resulting net.
+
+    If split is set and the checker is one of SEPARABLE, each group of
+    :func:`components` is proved on its own, so the search costs the sum rather
+    than the product of theirs. If the combined net fails the checker, the
+    whole sequent is searched as usual.
+
+    If samples is given and the checker is one of SAMPLED, each net is first
+    tested on that many random switchings (see :func:`sampling_checker`), and
+    only those without a cycle go on to the checker."""
+    opts = {'strategy': strategy, 'max_frontier': max_frontier, 'order': order}
+    if checker == None:
+        checker = cut_checker
+    if precheck and _rejected(exp0, exp1, checker): return None
+    separable = _base(checker) in SEPARABLE
+    if samples and _base(checker) in SAMPLED:
+        checker = sampling_checker(checker, samples)
+    if eta and balanced(exp0, exp1):
+        atomic = eta_atomic(exp0, exp1)
+        if atomic:
+            found = next(search(sequent_graph(exp0, exp1, atomic), checker, **opts), None)
+            if found is not None: return found[0]
+    if split and lemmas is None and separable:
+        done, g = _prove_components(exp0, exp1, checker, opts)
+        if done: return g
+    if lemmas is None:
+        return next(prove_all(exp0, exp1, checker, precheck=False, direct=direct, **opts), None)
+    g, forced = _start(exp0, exp1, direct)
+
+    # if the lemmas don't extend to a proof, search from scratch
+    used = set(l for pair in forced for l in pair)
+    links = ()
+    if balanced(exp0, exp1):
+        links = tuple(p for p in lemmas.plan(exp0, exp1) if p[0] not in used and p[1] not in used)
+    g1 = fuse_links(g, links) if links else None
+    found = None
+    if g1 is not None:
+        found = next(search(g1, checker, forced + links, **opts), None)
+    if found is None:
+        found = next(search(g, checker, forced, **opts), None)
+    if found is None: return None
+    lemmas.add(exp0, exp1, found[1])
+    return found[0]
+
+def _unlinked(g):
+    """Returns whether some variable edge of g can still be fused with a partner."""
+    for e0 in g.edges():
+        d = g.edata(e0)
+        inp0, outp0 = _leaf_ends(g, e0)
+        if not _fusible(g, e0, d, inp0, outp0): continue
+        if any(_fusion_case(g, d, inp0, outp0, e1) for e1 in g.edges()): return True
+    return False
+
+def _linking_labels(linking, leaves, lone):
+    """Returns the pairs of a linking with labels as tuples, raising ValueError if
+    it doesn't fit the given leaves."""
+    pairs = []
+    used = set()
+    for pair in linking:
+        try:
+            a, b = (tuple(l) if isinstance(l, list) else l for l in pair)
+        except (TypeError, ValueError):
+            raise ValueError("Links must be pairs of leaf labels, got {!r}".format(pair))
+        for l in (a, b):
+            if l is None:
+                if not lone: raise ValueError("None only stands for the root of a lone variable")
+            elif l not in leaves:
+                raise ValueError("No leaf labelled {!r}".format(l))
+            elif l in used:
+                raise ValueError("Leaf {!r} is linked twice".format(l))
             else:
-                return None
-        else:
-            for f in fusions:
-                g2 = rec(f)
-                if g2:
-                    return g2
-            return None
-    
-    return rec(g)
+                used.add(l)
+        pairs.append((a, b))
+    return pairs
+
+def check_all(exp0, exp1, linkings, checker=None):
+    """Generates the result of :func:`check` for each linking in turn, building the
+    graph of exp0 |- exp1 only once."""
+    if checker == None:
+        checker = cut_checker
+    g = sequent_graph(exp0, exp1)
+    leaves = _leaf_table(g)
+    lone = bool(_lone_roots(g))
+    for linking in linkings:
+        links = _linking_labels(linking, leaves, lone)
+        yield next((g1 for g1 in _fused_readings(g.copy(), links)
+                    if not _unlinked(g1) and checker(g1)), None)
+
+def check(exp0, exp1, linking, checker=None):
+    """Returns the proof net of exp0 |- exp1 with the given linking, or None if it
+    isn't one. The linking is a list of pairs of leaf labels, as yielded by
+    :func:`search` (where None is the root of a lone variable) or kept by
+    :class:`pypn.lemma.LemmaCache`. The leaves are fused as given and the
+    checker runs once, with no search. A linking fails if a pair can't be
+    fused, or if it leaves out variables that could still be linked. When both
+    sides are lone variables, None could be either root, and each is tried.
+    Raises ValueError if the linking names a leaf that doesn't exist, or one
+    twice."""
+    return next(check_all(exp0, exp1, [linking], checker))
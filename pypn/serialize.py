@@ -0,0 +1,285 @@
+# HOCC - Python library for higher order causal categories
+# Copyright (C) 2019 - Aleks Kissinger
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Compact binary format for graphs.
+
+A record consists of a fixed header followed by packed little-endian arrays:
+
+- vertices: ids (i), types (i), rows (d), positions (d), where unset rows and
+  positions are stored as NaN
+- edges: ids (i), sources (i), targets (i), formula index of the edge data (i),
+  where -1 means no data
+- arcs: vertex (i) and number of edges (i) per group of arcs (see
+  :meth:`pypn.graph.Graph.arc_groups`), followed by the edges of every group (i)
+- inputs (i) and outputs (i)
+- formulas: kind (b), a (i), b (i) per node, in post-order, and a table of
+  child indices (i). Variables point into the string table with a = name and
+  b = flags (1 = dual, 2 = atom). Pars and tensors use a = first child and
+  b = number of children.
+- strings: lengths (i) followed by the UTF-8 encoded names
+
+Formulas are interned, so each distinct subformula is stored once no matter how
+many edges carry it. Records may be concatenated, e.g. to archive many proof nets
+in one file (see :func:`iter_load`). Vertex data, such as the leaf labels
+used by :func:`pypn.proofnet.fuse_links`, is not stored, so graphs that still
+need it should be pickled instead.
+
+Version 1 records, which store one (first edge, second edge, vertex) entry per
+pair of edges with an arc instead, can still be read.
+"""
+
+import math
+import mmap as _mmap
+import struct
+import sys
+from array import array
+
+from .expr import Var, Unit, Par, Tensor, I
+
+__all__ = ['to_bytes', 'from_bytes', 'save', 'load', 'iter_load']
+
+MAGIC = b'PYPN'
+VERSION = 2
+_HEADER_V1 = struct.Struct('<4sHHqqqqqqqqqqq')
+_HEADER = struct.Struct('<4sHHqqqqqqqqqqqq')
+_KINDS = {Unit: 0, Var: 1, Par: 2, Tensor: 3}
+
+
+def _pack(code, values):
+    a = array(code, values)
+    if sys.byteorder == 'big': a.byteswap()
+    return a.tobytes()
+
+def _unpack(buf, offset, code, n):
+    a = array(code)
+    end = offset + n * a.itemsize
+    a.frombytes(buf[offset:end])
+    if sys.byteorder == 'big': a.byteswap()
+    return a, end
+
+def _number(x):
+    return int(x) if x.is_integer() else x
+
+
+class _FormulaTable(object):
+    def __init__(self):
+        self.index = dict()
+        self.by_id = dict()
+        self.kinds = []
+        self.a = []
+        self.b = []
+        self.children = []
+        self.strings = []
+        self.string_index = dict()
+
+    def add(self, e):
+        i = self.by_id.get(id(e))
+        if i is not None: return i
+        kind = _KINDS.get(type(e))
+        if kind is None:
+            raise TypeError("Can only serialize formula edge data, got " + repr(e))
+        if kind == 1:
+            s = self.string_index.get(e.name)
+            if s is None:
+                s = self.string_index[e.name] = len(self.strings)
+                self.strings.append(e.name)
+            key = (1, s, (1 if e.dual else 0) | (2 if e.atom else 0))
+        elif kind == 0:
+            key = (0, 0, 0)
+        else:
+            key = (kind, tuple(self.add(c) for c in e.children()))
+
+        i = self.index.get(key)
+        if i is None:
+            i = self.index[key] = len(self.kinds)
+            self.kinds.append(kind)
+            if kind >= 2:
+                self.a.append(len(self.children))
+                self.b.append(len(key[1]))
+                self.children.extend(key[1])
+            else:
+                self.a.append(key[1])
+                self.b.append(key[2])
+        self.by_id[id(e)] = i
+        return i
+
+
+def to_bytes(g):
+    """Serialize the graph g to bytes."""
+    vs = list(g.vertices())
+    ty = g.types()
+    rs = g.rows()
+    ps = g.positions()
+    nan = float('nan')
+
+    es = list(g.edges())
+    table = _FormulaTable()
+    edata = [-1 if g.edata(e) is None else table.add(g.edata(e)) for e in es]
+    groups = g.arc_groups()
+    names = [s.encode('utf-8') for s in table.strings]
+
+    body = [
+        _pack('i', vs),
+        _pack('i', [ty[v] for v in vs]),
+        _pack('d', [rs.get(v, nan) for v in vs]),
+        _pack('d', [ps.get(v, nan) for v in vs]),
+        _pack('i', es),
+        _pack('i', [g.edge_s(e) for e in es]),
+        _pack('i', [g.edge_t(e) for e in es]),
+        _pack('i', edata),
+        _pack('i', [v for v, _ in groups]),
+        _pack('i', [len(aes) for _, aes in groups]),
+        _pack('i', [e for _, aes in groups for e in aes]),
+        _pack('i', g.inputs),
+        _pack('i', g.outputs),
+        _pack('b', table.kinds),
+        _pack('i', table.a),
+        _pack('i', table.b),
+        _pack('i', table.children),
+        _pack('i', [len(s) for s in names]),
+    ] + names
+    size = _HEADER.size + sum(len(b) for b in body)
+    header = _HEADER.pack(MAGIC, VERSION, 0, size, g.vindex(), g._eindex,
+            len(vs), len(es), len(groups), len(g.inputs), len(g.outputs),
+            len(table.kinds), len(table.children), len(names),
+            sum(len(aes) for _, aes in groups))
+    return b''.join([header] + body)
+
+
+def from_bytes(data, offset=0, cls=None):
+    """Read a graph from a bytes-like object (e.g. bytes, memoryview or mmap), starting
+    at the given offset. Returns the graph."""
+    return _read(data, offset, cls)[0]
+
+
+def _read(data, offset=0, cls=None):
+    if cls is None:
+        from .graph import Graph
+        cls = Graph
+    buf = memoryview(data)
+    (magic, version, _, size, vindex, eindex, nv, ne, na, ni, no, nf, nc, ns) = \
+        _HEADER_V1.unpack_from(buf, offset)
+    if magic != MAGIC:
+        raise ValueError("Not a serialized graph")
+    if version > VERSION:
+        raise ValueError("Unsupported graph format version {}".format(version))
+    if version == 1:
+        off = offset + _HEADER_V1.size
+    else:
+        nae = _HEADER.unpack_from(buf, offset)[-1]
+        off = offset + _HEADER.size
+    vs, off = _unpack(buf, off, 'i', nv)
+    types, off = _unpack(buf, off, 'i', nv)
+    rows, off = _unpack(buf, off, 'd', nv)
+    positions, off = _unpack(buf, off, 'd', nv)
+    es, off = _unpack(buf, off, 'i', ne)
+    sources, off = _unpack(buf, off, 'i', ne)
+    targets, off = _unpack(buf, off, 'i', ne)
+    edata, off = _unpack(buf, off, 'i', ne)
+    if version == 1:
+        arc1, off = _unpack(buf, off, 'i', na)
+        arc2, off = _unpack(buf, off, 'i', na)
+        arcv, off = _unpack(buf, off, 'i', na)
+    else:
+        arcv, off = _unpack(buf, off, 'i', na)
+        arcn, off = _unpack(buf, off, 'i', na)
+        arce, off = _unpack(buf, off, 'i', nae)
+    inputs, off = _unpack(buf, off, 'i', ni)
+    outputs, off = _unpack(buf, off, 'i', no)
+    kinds, off = _unpack(buf, off, 'b', nf)
+    fa, off = _unpack(buf, off, 'i', nf)
+    fb, off = _unpack(buf, off, 'i', nf)
+    children, off = _unpack(buf, off, 'i', nc)
+    lengths, off = _unpack(buf, off, 'i', ns)
+    strings = []
+    for l in lengths:
+        strings.append(str(buf[off:off+l], 'utf-8'))
+        off += l
+
+    formulas = []
+    for kind, a, b in zip(kinds, fa, fb):
+        if kind == 0: f = I
+        elif kind == 1: f = Var(strings[a], dual=bool(b & 1), atom=bool(b & 2))
+        elif kind == 2: f = Par([formulas[c] for c in children[a:a+b]])
+        else: f = Tensor([formulas[c] for c in children[a:a+b]])
+        formulas.append(f)
+
+    g = cls()
+    g._vindex = vindex
+    g._eindex = eindex
+    for v, t, r, p in zip(vs, types, rows, positions):
+        g.graph[v] = dict()
+        g.ty[v] = t
+        if not math.isnan(r): g.set_row(v, _number(r))
+        if not math.isnan(p): g.set_position(v, _number(p))
+
+    for e, s, t, d in zip(es, sources, targets, edata):
+        nhd = g.graph[s].get(t)
+        if nhd is None:
+            nhd = g.graph[s][t] = [set(), set()]
+            g.graph[t][s] = [set(), set()]
+        nhd[1].add(e)
+        g.graph[t][s][0].add(e)
+        g._source[e] = s
+        g._target[e] = t
+        g._arcs[e] = dict()
+        if d != -1: g._edata[e] = formulas[d]
+
+    if version == 1:
+        for e1, e2, v in zip(arc1, arc2, arcv):
+            g.add_arc(e1, e2, v)
+    else:
+        i = 0
+        for v, n in zip(arcv, arcn):
+            g.add_arc_group(v, arce[i:i+n])
+            i += n
+
+    g.inputs = list(inputs)
+    g.outputs = list(outputs)
+    return g, offset + size
+
+
+def save(g, path):
+    """Write the graph g to a file."""
+    with open(path, 'wb') as f:
+        f.write(to_bytes(g))
+
+
+def load(path, mmap=True, cls=None):
+    """Read a graph from a file. If mmap is set, the file is memory-mapped rather
+    than read into memory."""
+    for g in iter_load(path, mmap, cls):
+        return g
+    raise ValueError("No graph in " + path)
+
+
+def iter_load(path, mmap=True, cls=None):
+    """Iterate over the graphs in a file of concatenated records."""
+    with open(path, 'rb') as f:
+        if mmap:
+            try:
+                data = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+            except ValueError: # empty file
+                return
+        else:
+            data = f.read()
+        try:
+            offset = 0
+            while offset < len(data):
+                g, offset = _read(data, offset, cls)
+                yield g
+        finally:
+            if mmap: data.close()
@@ -0,0 +1,242 @@
+# HOCC - Python library for higher order causal categories
+# Copyright (C) 2019 - Aleks Kissinger
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""A local proving service over HTTP/JSON, run as ``python -m pypn.serve``.
+
+Endpoints:
+
+- ``POST /prove`` with a JSON body ``{"sequent": "A |- B", "checker": "cut",
+  "timeout": 10, "eta": false}``, where all but the sequent are optional (a
+  plain text body is read as the sequent). Returns the result of
+  :func:`pypn.batch.prove_sequent`, plus 'cached', or status 504 when the
+  deadline passes and 400 for bad requests.
+- ``GET /metrics``: request counts, queue depth, cache statistics and latencies.
+
+Sequents are proved in a process pool. A search that runs past its deadline
+can't be interrupted inside a worker, so it is left to finish and its result
+still goes into the cache, which is shared by all requests.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .parse import parse_sequent
+from . import batch
+
+__all__ = ['ProofServer', 'main']
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 504: 'Gateway Timeout'}
+
+
+class ProofServer(object):
+    """Serves proof requests from a pool of worker processes."""
+    def __init__(self, workers=None, timeout=10.0, cache_size=4096, max_body=1 << 20):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.max_body = max_body
+        self.cache = OrderedDict()
+        self.pending = dict()
+        self.pool = None
+        self.started = time.time()
+        self.latencies = deque(maxlen=1000)
+        self.counts = {'requests': 0, 'proved': 0, 'unproved': 0, 'errors': 0,
+                       'timeouts': 0, 'cache_hits': 0}
+        self.queued = 0
+
+    # -- proof cache
+
+    def _cache_get(self, key):
+        r = self.cache.get(key)
+        if r is not None: self.cache.move_to_end(key)
+        return r
+
+    def _cache_put(self, key, r):
+        self.cache[key] = r
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def prove(self, text, checker='cut', timeout=None, eta=False):
+        """Returns (status, result) for a sequent."""
+        exp0, exp1 = parse_sequent(text)
+        batch.checker_by_name(checker)
+        text = '{} |- {}'.format(exp0, exp1)
+        key = (text, checker, bool(eta))
+        r = self._cache_get(key)
+        if r is not None:
+            self.counts['cache_hits'] += 1
+            return 200, dict(r, cached=True)
+
+        # requests for a sequent already being proved wait for the same task
+        fut = self.pending.get(key)
+        if fut is None:
+            loop = asyncio.get_running_loop()
+            fut = loop.run_in_executor(self.pool, batch.prove_sequent, text, checker, eta)
+            self.pending[key] = fut
+            self.queued += 1
+            fut.add_done_callback(lambda f: self._done(key, f))
+        try:
+            r = await asyncio.wait_for(asyncio.shield(fut),
+                                       self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self.counts['timeouts'] += 1
+            return 504, {'sequent': text, 'error': 'timeout'}
+        if 'error' in r: return 400, r
+        return 200, dict(r, cached=False)
+
+    def _done(self, key, fut):
+        self.queued -= 1
+        del self.pending[key]
+        if not fut.cancelled() and fut.exception() is None:
+            r = fut.result()
+            if 'error' not in r: self._cache_put(key, r)
+
+    def metrics(self):
+        lat = sorted(self.latencies)
+        def pct(p): return lat[min(len(lat) - 1, int(p * len(lat)))] if lat else None
+        return dict(self.counts,
+                    queue_depth=self.queued,
+                    workers=self.workers,
+                    cache_size=len(self.cache),
+                    uptime=time.time() - self.started,
+                    latency={'count': len(lat),
+                             'mean': sum(lat) / len(lat) if lat else None,
+                             'p50': pct(0.5), 'p95': pct(0.95), 'p99': pct(0.99),
+                             'max': lat[-1] if lat else None})
+
+    # -- HTTP
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                try:
+                    method, path, version = line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'bad request line'}, False)
+                    break
+                headers = dict()
+                while True:
+                    h = await reader.readline()
+                    if h in (b'\r\n', b'\n', b''): break
+                    k, _, v = h.decode('latin-1').partition(':')
+                    headers[k.strip().lower()] = v.strip()
+                try:
+                    length = int(headers.get('content-length', 0))
+                    if length < 0: raise ValueError
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'bad content length'}, False)
+                    break
+                if length > self.max_body:
+                    await self._respond(writer, 413, {'error': 'body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = (headers.get('connection', '').lower() != 'close' and
+                              version != 'HTTP/1.0')
+                status, result = await self._route(method, path, headers, body)
+                await self._respond(writer, status, result, keep_alive)
+                if not keep_alive: break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, headers, body):
+        path = path.split('?')[0]
+        if path == '/metrics':
+            if method != 'GET': return 405, {'error': 'use GET'}
+            return 200, self.metrics()
+        if path != '/prove': return 404, {'error': 'not found'}
+        if method != 'POST': return 405, {'error': 'use POST'}
+
+        t = time.perf_counter()
+        self.counts['requests'] += 1
+        try:
+            if headers.get('content-type', '').startswith('application/json'):
+                req = json.loads(body)
+                if not isinstance(req, dict) or 'sequent' not in req:
+                    raise ValueError("expected an object with a 'sequent' field")
+            else:
+                req = {'sequent': body.decode('utf-8')}
+            sequent, checker = req['sequent'], req.get('checker', 'cut')
+            timeout, eta = req.get('timeout'), req.get('eta', False)
+            if not isinstance(sequent, str): raise ValueError("'sequent' must be a string")
+            if not isinstance(checker, str): raise ValueError("'checker' must be a string")
+            if timeout is not None and (isinstance(timeout, bool) or
+                                        not isinstance(timeout, (int, float)) or
+                                        not 0 < timeout < float('inf')):
+                raise ValueError("'timeout' must be a positive number of seconds")
+            if not isinstance(eta, bool): raise ValueError("'eta' must be true or false")
+            status, result = await self.prove(sequent.strip(), checker, timeout, eta)
+        except ValueError as ex:
+            status, result = 400, {'error': str(ex)}
+
+        if status == 200:
+            self.counts['proved' if result['proved'] else 'unproved'] += 1
+        elif status == 400:
+            self.counts['errors'] += 1
+        self.latencies.append(time.perf_counter() - t)
+        return status, result
+
+    async def _respond(self, writer, status, result, keep_alive):
+        body = json.dumps(result).encode('utf-8')
+        writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\n'
+                     'Content-Length: {}\r\nConnection: {}\r\n\r\n'.format(
+                         status, _REASONS.get(status, ''), len(body),
+                         'keep-alive' if keep_alive else 'close').encode('latin-1'))
+        writer.write(body)
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        """Runs the server until cancelled."""
+        with ProcessPoolExecutor(self.workers) as pool:
+            self.pool = pool
+            server = await asyncio.start_server(self.handle, host, port)
+            async with server:
+                await server.serve_forever()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog='python -m pypn.serve',
+                                description='Serve proofs of sequents over HTTP/JSON.')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8080)
+    p.add_argument('--workers', type=int, default=None,
+                   help='number of worker processes (default: number of CPUs)')
+    p.add_argument('--timeout', type=float, default=10.0,
+                   help='default deadline per request in seconds')
+    p.add_argument('--cache', type=int, default=4096,
+                   help='number of results kept in the proof cache')
+    args = p.parse_args(argv)
+
+    server = ProofServer(args.workers, args.timeout, args.cache)
+    print('Serving on http://{}:{} with {} workers'.format(args.host, args.port, server.workers), flush=True)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+# HOCC - Python library for higher order causal categories
+# Copyright (C) 2019 - Aleks Kissinger
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Static SVG export of graphs, without a browser or notebook.
+
+The output matches what ``js/hocc.js`` draws for :func:`pypn.d3.draw`: the same
+layout, node colours, edge paths, edge labels and arcs.
+"""
+
+import math
+from xml.sax.saxutils import escape
+
+from .d3 import graph_data
+
+__all__ = ['to_svg', 'save_svg']
+
+NODE_COLORS = {0: 'black', 1: 'blue', 2: 'red', 3: 'yellow'}
+
+
+def _num(x):
+    return ('%.2f' % x).rstrip('0').rstrip('.')
+
+
+def _edge_path(s, t, edge_index, num_siblings, flip, scale):
+    """Returns the path data of an edge, as in path_data in hocc.js, together with
+    a list of points approximating it."""
+    if flip: edge_index = num_siblings - edge_index - 1
+    center = (num_siblings - 1) / 2
+    d = "M {} {}".format(_num(s[0]), _num(s[1]))
+
+    if num_siblings == 1 or edge_index == center:
+        return d + " L {} {}".format(_num(t[0]), _num(t[1])), [s, t]
+
+    dx = t[0] - s[0]
+    dy = t[1] - s[1]
+    dist = math.sqrt(dx * dx + dy * dy)
+    rx = 1.1 * (dist / 2)
+    ry = abs(edge_index - center) * 1.5 * scale
+    rotate = math.degrees(math.atan2(dy, dx))
+    sweep = 0 if edge_index < num_siblings / 2 else 1
+    d += " A {} {} {} 0 {} {} {}".format(_num(rx), _num(ry), _num(rotate), sweep,
+            _num(t[0]), _num(t[1]))
+    return d, _arc_points(s, t, rx, ry, rotate, 0, sweep)
+
+
+def _arc_points(p1, p2, rx, ry, rotate, large_arc, sweep, n=24):
+    """Points along an SVG elliptical arc, using the conversion from endpoint to
+    centre parametrisation in the SVG specification."""
+    if rx == 0 or ry == 0 or p1 == p2: return [p1, p2]
+    phi = math.radians(rotate)
+    cos_phi, sin_phi = math.cos(phi), math.sin(phi)
+    hx = (p1[0] - p2[0]) / 2
+    hy = (p1[1] - p2[1]) / 2
+    x1 = cos_phi * hx + sin_phi * hy
+    y1 = -sin_phi * hx + cos_phi * hy
+
+    lam = (x1 * x1) / (rx * rx) + (y1 * y1) / (ry * ry)
+    if lam > 1:
+        rx *= math.sqrt(lam)
+        ry *= math.sqrt(lam)
+
+    num = rx * rx * ry * ry - rx * rx * y1 * y1 - ry * ry * x1 * x1
+    den = rx * rx * y1 * y1 + ry * ry * x1 * x1
+    coef = math.sqrt(max(0.0, num / den))
+    if large_arc == sweep: coef = -coef
+    cx1 = coef * rx * y1 / ry
+    cy1 = -coef * ry * x1 / rx
+    cx = cos_phi * cx1 - sin_phi * cy1 + (p1[0] + p2[0]) / 2
+    cy = sin_phi * cx1 + cos_phi * cy1 + (p1[1] + p2[1]) / 2
+
+    def angle(ux, uy, vx, vy):
+        a = math.atan2(ux * vy - uy * vx, ux * vx + uy * vy)
+        return a
+
+    theta = angle(1, 0, (x1 - cx1) / rx, (y1 - cy1) / ry)
+    delta = angle((x1 - cx1) / rx, (y1 - cy1) / ry, (-x1 - cx1) / rx, (-y1 - cy1) / ry)
+    if not sweep and delta > 0: delta -= 2 * math.pi
+    elif sweep and delta < 0: delta += 2 * math.pi
+
+    pts = []
+    for i in range(n + 1):
+        a = theta + delta * i / n
+        ex = rx * math.cos(a)
+        ey = ry * math.sin(a)
+        pts.append((cos_phi * ex - sin_phi * ey + cx, sin_phi * ex + cos_phi * ey + cy))
+    return pts
+
+
+def _length(pts):
+    return sum(math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(pts, pts[1:]))
+
+
+def _point_at_length(pts, l):
+    for a, b in zip(pts, pts[1:]):
+        seg = math.hypot(b[0] - a[0], b[1] - a[1])
+        if l <= seg:
+            f = l / seg if seg else 0
+            return (a[0] + f * (b[0] - a[0]), a[1] + f * (b[1] - a[1]))
+        l -= seg
+    return pts[-1]
+
+
+def to_svg(g, scale=None, row_scale=1, labels=False, collapse=None):
+    """Returns an SVG drawing of g as a string. The parameters are the same as
+    for :func:`pypn.d3.draw`."""
+    if scale == None: scale = 50
+    node_size = 0.1 * scale
+    if node_size < 2: node_size = 2
+    w = (g.depth() + 2) * scale * row_scale
+    h = (g.position_count() + 3) * scale
+
+    data = graph_data(g, scale, row_scale, collapse)
+    nodes = data['nodes']
+    links = data['links']
+    arcs = data['arcs']
+    xy = list(zip(nodes['x'], nodes['y']))
+    names = nodes['name']
+    counts = nodes.get('n')
+
+    out = ['<svg xmlns="http://www.w3.org/2000/svg" '
+           'xmlns:xlink="http://www.w3.org/1999/xlink" width="{}" height="{}">'.format(_num(w), _num(h)),
+           '<defs><marker id="arrowhead" viewBox="0 -5 10 10" refX="{}" refY="0" orient="auto" '
+           'markerWidth="5" markerHeight="5" markerUnits="strokeWidth">'
+           '<path d="M0,-5L10,0L0,5" fill="#999"/></marker></defs>'.format(_num(node_size * 3))]
+
+    paths = []
+    out.append('<g class="link">')
+    for i in range(len(links['source'])):
+        s, t = links['source'][i], links['target'][i]
+        d, pts = _edge_path(xy[s], xy[t], links['edge_index'][i],
+                            links['num_edge_siblings'][i], names[s] > names[t], scale)
+        paths.append(pts)
+        out.append('<path id="edge_{}" d="{}" stroke="#999" fill="none" style="stroke-width: 1.5px" '
+                   'marker-end="url(#arrowhead)"/>'.format(i, d))
+    out.append('</g><g>')
+    for i, l in enumerate(links['label']):
+        out.append('<text dy="-2"><textPath xlink:href="#edge_{}" startOffset="50%" '
+                   'text-anchor="middle">{}</textPath></text>'.format(i, escape(data['labels'][l])))
+    out.append('</g><g class="arc">')
+
+    # arcs are drawn 15 units along each edge from the vertex they sit at, as one
+    # path through the edges in order
+    for ls, v in zip(arcs['links'], arcs['at_v']):
+        at = xy[v]
+        ps = []
+        for l in ls:
+            pts = paths[l]
+            ps.append(_point_at_length(pts, _length(pts) - 15 if links['target'][l] == v else 15))
+        d = ['M {} {}'.format(_num(ps[0][0]), _num(ps[0][1]))]
+        for p1, p2 in zip(ps, ps[1:]):
+            a = p2[0] * p1[1] + at[0] * p2[1] + p1[0] * at[1]
+            b = p1[0] * p2[1] + p2[0] * at[1] + at[0] * p1[1]
+            d.append('A 15 15 0 0 {} {} {}'.format(1 if a < b else 0, _num(p2[0]), _num(p2[1])))
+        out.append('<path d="{}" stroke="#99f" fill="none" style="stroke-width: 1.5px"/>'.format(
+            ' '.join(d)))
+
+    out.append('</g><g class="node">')
+    for i, (x, y) in enumerate(xy):
+        n = counts[i] if counts else 1
+        r = node_size * min(3, math.sqrt(n)) if n > 1 else node_size
+        out.append('<g transform="translate({},{})"><circle r="{}" fill="{}" stroke="black"/>'.format(
+            _num(x), _num(y), _num(r), NODE_COLORS.get(nodes['t'][i], 'black')))
+        if n > 1:
+            out.append('<text y="{}" text-anchor="middle" font-size="10px" font-family="monospace" '
+                       'fill="#666">{}</text>'.format(_num(0.7 * node_size + 14), n))
+        if labels:
+            out.append('<text y="{}" text-anchor="middle" font-size="8px" font-family="monospace" '
+                       'fill="#ccc">{}</text>'.format(_num(-0.7 * node_size - 5), names[i]))
+        out.append('</g>')
+    out.append('</g></svg>\n')
+    return ''.join(out)
+
+
+def save_svg(g, path, **kwargs):
+    """Write an SVG drawing of g to a file. Keyword arguments are passed on to
+    :func:`to_svg`."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(to_svg(g, **kwargs))
@@ -0,0 +1,38 @@
+"""Small random sequents shared by the tests."""
+
+import random
+
+from pypn.expr import Var
+
+NAMES = ('a', 'b', 'c')
+
+
+def random_formula(rng, depth, names=NAMES):
+    if depth == 0 or rng.random() < 0.3:
+        v = Var(rng.choice(names), atom=True)
+        return ~v if rng.random() < 0.4 else v
+    ch = [random_formula(rng, depth - 1, names) for _ in range(rng.choice([2, 2, 3]))]
+    e = ch[0]
+    for c in ch[1:]:
+        e = (e * c) if rng.random() < 0.5 else (e + c)
+    return e
+
+
+def random_sequents(n, seed=0, depth=2, names=NAMES):
+    rng = random.Random(seed)
+    return [(random_formula(rng, depth, names), random_formula(rng, depth, names))
+            for _ in range(n)]
+
+
+def balanced(*formulas):
+    """Whether every variable occurs as often with each polarity in the sequent
+    formulas[0] |- formulas[1]."""
+    count = dict()
+    def walk(e, sign):
+        if isinstance(e, Var):
+            count[e.name] = count.get(e.name, 0) + (-sign if e.dual else sign)
+        elif e.children():
+            for c in e.children(): walk(c, sign)
+    for side, e in enumerate(formulas):
+        walk(e, 1 if side == 0 else -1)
+    return not any(count.values())
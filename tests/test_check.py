@@ -0,0 +1,37 @@
+import pytest
+
+from pypn import check, check_all, proofnet
+from pypn.expr import Var
+
+X, Y = Var('X0'), Var('Y0')
+
+
+def test_linkings_from_search():
+    for a, b in [(X * Y, Y * X), (X * Y, X + Y), (X + ~X, Y * ~Y), (X, X), (X, X * Y)]:
+        g, links = proofnet._start(a, b, direct=False)
+        for g1, ls in proofnet.search(g, lambda g: True, links):
+            assert (check(a, b, ls) is not None) == proofnet.cut_checker(g1)
+
+
+def test_partial_and_wrong_linkings():
+    assert check(X * Y, Y * X, [((0, 0), (1, 1)), ((0, 1), (1, 0))]) is not None
+    assert check(X * Y, Y * X, [((0, 0), (1, 1))]) is None
+    assert check(X * Y, Y * X, [((0, 0), (1, 0)), ((0, 1), (1, 1))]) is None
+
+
+def test_batch():
+    links = [[((0, 0), (1, 1)), ((0, 1), (1, 0))], [((0, 0), (1, 0)), ((0, 1), (1, 1))],
+             [[[0, 0], [1, 1]], [[0, 1], [1, 0]]]]
+    assert [g is not None for g in check_all(X * Y, Y * X, links)] == [True, False, True]
+
+
+@pytest.mark.parametrize('linking', [
+    [((0, 0), (1, 7))],
+    [((0, 0), (1, 0)), ((0, 0), (1, 1))],
+    [((0, 0),)],
+    [5],
+    [((0, 0), None)],
+])
+def test_malformed_linkings(linking):
+    with pytest.raises(ValueError):
+        check(X * Y, Y * X, linking)
@@ -0,0 +1,40 @@
+import random
+
+from pypn import prove, proofnet
+from pypn.canon import is_isomorphic
+from pypn.expr import Var
+
+from sequents import random_formula, balanced
+
+a, b, c = (Var(n, atom=True) for n in 'abc')
+
+
+def test_compose_and_normalise():
+    g = proofnet.compose_proofs(prove(a * b, b * a), prove(b * a, a * b))
+    assert proofnet.find_cuts(g) == []
+    assert is_isomorphic(g, prove(a * b, a * b))
+
+
+def test_atomic_cut_formula():
+    g1 = prove(a * b, b)
+    assert is_isomorphic(proofnet.compose_proofs(g1, prove(b, b)), g1)
+    g2 = prove(b, a + b)
+    assert is_isomorphic(proofnet.compose_proofs(prove(b, b), g2), g2)
+    g = proofnet.compose_proofs(prove(a * ~a * b, b), prove(b, (c + ~c) * b))
+    assert proofnet.find_cuts(g) == []
+    assert proofnet.cut_checker(g)
+
+
+def test_random_compositions():
+    rng = random.Random(3)
+    n = 0
+    while n < 100:
+        x, y = random_formula(rng, 2), random_formula(rng, 2)
+        z = random_formula(rng, rng.choice([0, 1, 2]))
+        if not (balanced(x, z) and balanced(z, y)): continue
+        g1, g2 = prove(x, z), prove(z, y)
+        if g1 is None or g2 is None: continue
+        g = proofnet.compose_proofs(g1, g2)
+        assert proofnet.find_cuts(g) == []
+        assert proofnet.cut_checker(g)
+        n += 1
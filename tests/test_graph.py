@@ -0,0 +1,13 @@
+from pypn.graph import Graph
+
+
+def test_arcs_at_a_vertex_are_transitive():
+    g = Graph()
+    v = g.add_vertex(1)
+    e1, e2, e3 = [g.add_edge(v, g.add_vertex(0)) for _ in range(3)]
+    g.add_arc(e1, e2, v)
+    g.add_arc(e2, e3, v)
+    assert g.has_arc(e1, e3)
+    assert g.arc_groups() == [(v, [e1, e2, e3])]
+    g.remove_arc(e1, e2, v)
+    assert not g.has_arc(e2) and g.has_arc(e1, e3)
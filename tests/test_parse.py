@@ -0,0 +1,27 @@
+import pytest
+
+from pypn.parse import parse, parse_sequent
+from pypn.expr import Var, I
+
+X, Y = Var('X0'), Var('Y0')
+
+
+def test_same_as_operators():
+    assert parse('(X0 -o Y0) * ~X0') == (X >> Y) * ~X
+    assert parse('X0 + Y0 * X0') == X + (Y * X)
+    assert parse_sequent('X0 * Y0 |- Y0 * X0') == (X * Y, Y * X)
+    assert parse_sequent('|- X0 -o X0') == (I, X >> X)
+
+
+@pytest.mark.parametrize('text', ['X0 +', '(X0 * Y0', 'X0 $ Y0', 'X0 Y0', '',
+                                  '(' * 5000 + 'X0' + ')' * 5000, '~' * 5000 + 'X0'])
+def test_errors(text):
+    with pytest.raises(ValueError):
+        parse(text)
+
+
+def test_sequent_errors():
+    with pytest.raises(ValueError):
+        parse_sequent('X0 * Y0')
+    with pytest.raises(ValueError):
+        parse_sequent('(' * 5000 + 'X0' + ')' * 5000 + ' |- X0')
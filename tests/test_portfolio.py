@@ -0,0 +1,11 @@
+from pypn import parse_sequent
+from pypn.portfolio import Portfolio
+
+
+def test_unprovable_needs_every_configuration():
+    portfolio = Portfolio([{'checker': 'cut'}, {'checker': 'hocc'}], size=2, explore=False)
+    # cut_checker finds no net, hocc_cut_checker does
+    assert portfolio.prove(*parse_sequent('c + (b + c) |- (~c * b * c) + ~a'), timeout=60) is not None
+    assert portfolio.winner == 'checker=hocc'
+    assert portfolio.prove(*parse_sequent('~c + c |- a'), timeout=60) is None
+    assert portfolio.runs == {'checker=cut': 2, 'checker=hocc': 2}
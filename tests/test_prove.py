@@ -0,0 +1,74 @@
+import pytest
+
+from pypn import prove, prove_all, count_proofs, proofnet, parse_sequent
+from pypn.expr import Var
+from pypn.lemma import LemmaCache
+
+from sequents import random_sequents
+
+X, Y = Var('X0'), Var('Y0')
+CHECKERS = [proofnet.cut_checker, proofnet.switching_checker, proofnet.hocc_cut_checker]
+SEQUENTS = random_sequents(60, seed=1)
+# sequents where a shortcut once found a net that the plain search doesn't
+UNBALANCED = [parse_sequent(s) for s in [
+    '~a + ((b * a * ~a) * (~a + ~b)) |- ((b * a * ~a) * (~a + ~b)) + a',
+    '(a * c * c) + ((~c + a + ~b) * ~a) |- ~c * ((~c + a + ~b) * ~a)',
+    '(c + c + (c + ~a)) * b |- (c * (c + a + b)) + (~c + (~c * ~a * ~b)) + ~a',
+]]
+
+
+def test_count_proofs():
+    assert count_proofs(X * Y, Y * X) == 1
+    assert count_proofs(X * X, X * X) == 2
+    assert count_proofs(X * X, X * X, unique=True) == 1
+    for a, b in SEQUENTS[:30]:
+        assert count_proofs(a, b) == sum(1 for _ in prove_all(a, b))
+
+
+@pytest.mark.parametrize('checker', CHECKERS)
+def test_prove_agrees_with_prove_all(checker):
+    for a, b in SEQUENTS:
+        plain = next(prove_all(a, b, checker, precheck=False, direct=False), None)
+        assert (prove(a, b, checker) is None) == (plain is None)
+        assert (next(prove_all(a, b, checker), None) is None) == (plain is None)
+
+
+@pytest.mark.parametrize('checker', CHECKERS)
+def test_lemmas_keep_answers(checker):
+    cache = LemmaCache()
+    for a, b in UNBALANCED + SEQUENTS:
+        for x in a.children() or []:
+            for y in b.children() or []:
+                prove(x, y, checker, lemmas=cache)
+        assert (prove(a, b, checker, lemmas=cache) is None) == (prove(a, b, checker) is None)
+
+
+@pytest.mark.parametrize('checker', CHECKERS)
+def test_eta_keeps_answers(checker):
+    p, q, r = X * ~Y, X + (Y * X), ~Y
+    shared = [(p * q, q * p), ((p + r) * q, q * (r + p)), (p * (q + r), (p * q) + r),
+              (p + ~q, ~q + p)]
+    for a, b in UNBALANCED + SEQUENTS + shared:
+        assert (prove(a, b, checker, eta=True) is None) == (prove(a, b, checker) is None)
+
+
+def test_pipeline_keeps_answers():
+    sequents = [parse_sequent(s) for s in [
+        'c + (b + c) |- (~c * b * c) + ~a',
+        '(b + a + c) * (~a + ~c) |- (b + ~b + ~c) * (c * c)',
+    ]]
+    for checker in CHECKERS:
+        pipeline = proofnet.CheckerPipeline(checker)
+        for a, b in sequents + SEQUENTS:
+            assert (prove(a, b, pipeline) is None) == (prove(a, b, checker) is None)
+
+
+@pytest.mark.parametrize('checker', CHECKERS)
+def test_fewest_keeps_answers(checker):
+    sequents = [parse_sequent(s) for s in [
+        '(b + ~b) + c |- (~a * b) * (b * ~a)',
+        '~a + (a * ~b) |- ~c + (b + ~a)',
+        '(~a + ~b + ~c) + a |- (~c + c) * (~a + ~c)',
+    ]]
+    for a, b in sequents + SEQUENTS:
+        assert (prove(a, b, checker, order='fewest') is None) == (prove(a, b, checker) is None)
@@ -0,0 +1,32 @@
+import copy
+import pickle
+
+from pypn import Graph, prove, proofnet
+from pypn.expr import Var
+
+X, Y = Var('X0'), Var('Y0')
+
+
+def _dump(g):
+    return (dict(g.types()), dict(g.rows()), dict(g.positions()),
+            dict((e, (g.edge_st(e), str(g.edata(e)))) for e in g.edges()),
+            sorted(g.arcs()), g.inputs, g.outputs)
+
+
+def test_bytes_round_trip():
+    g = prove(X * (Y + ~Y), (Y + ~Y) * X)
+    assert _dump(Graph.from_bytes(g.to_bytes())) == _dump(g)
+
+
+def test_pickle_keeps_vertex_data():
+    g = proofnet.sequent_graph(X * Y, X * Y)
+    for h in (pickle.loads(pickle.dumps(g)), copy.deepcopy(g)):
+        assert _dump(h) == _dump(g)
+        assert h._vdata == g._vdata
+        assert proofnet.fuse_links(h, [((0, 0), (1, 0))]) is not None
+
+
+def test_pickle_any_edge_data():
+    g = Graph()
+    g.add_edge(g.add_vertex(0), g.add_vertex(1), 'label')
+    assert pickle.loads(pickle.dumps(g)).edata(0) == 'label'
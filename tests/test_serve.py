@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+import pytest
+
+from pypn.serve import ProofServer
+
+
+class Writer(object):
+    def __init__(self):
+        self.data = b''
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def request(server, raw):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        writer = Writer()
+        await server.handle(reader, writer)
+        return writer.data
+    head, _, body = asyncio.run(run()).partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+def post(server, req):
+    body = json.dumps(req).encode('utf-8')
+    return request(server, b'POST /prove HTTP/1.1\r\nContent-Type: application/json\r\n'
+                           b'Content-Length: ' + str(len(body)).encode() + b'\r\n'
+                           b'Connection: close\r\n\r\n' + body)
+
+
+@pytest.mark.parametrize('req', [
+    {'sequent': 5},
+    {'sequent': 'a |- a', 'checker': ['cut']},
+    {'sequent': 'a |- a', 'timeout': 'soon'},
+    {'sequent': 'a |- a', 'timeout': -1},
+    {'sequent': 'a |- a', 'timeout': True},
+    {'sequent': 'a |- a', 'eta': 'yes'},
+])
+def test_bad_fields(req):
+    status, result = post(ProofServer(), req)
+    assert status == 400 and 'error' in result
+
+
+@pytest.mark.parametrize('length', [b'ten', b'-4'])
+def test_bad_content_length(length):
+    status, result = request(ProofServer(), b'POST /prove HTTP/1.1\r\nContent-Length: ' +
+                             length + b'\r\n\r\na |- a')
+    assert status == 400 and 'error' in result
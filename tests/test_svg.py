@@ -0,0 +1,19 @@
+from pypn import Graph, svg
+
+
+def test_parallel_edges_flip_like_hocc_js(monkeypatch):
+    # hocc.js flips parallel edges whose source id is larger as a number
+    g = Graph()
+    for i in range(11): g.add_vertex(0, i, i)
+    g.add_edge(2, 10)
+    g.add_edge(2, 10)
+    g.add_edge(9, 3)
+    g.add_edge(9, 3)
+    flips = []
+    edge_path = svg._edge_path
+    def record(s, t, edge_index, num_siblings, flip, scale):
+        flips.append(flip)
+        return edge_path(s, t, edge_index, num_siblings, flip, scale)
+    monkeypatch.setattr(svg, '_edge_path', record)
+    svg.to_svg(g)
+    assert flips == [False, False, True, True]
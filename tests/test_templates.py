@@ -0,0 +1,22 @@
+from pypn import proofnet
+from pypn.expr import Var
+
+X, Y, Z = Var('X0'), Var('Y0'), Var('Z0')
+FORMULAS = [X, X * Y, (X + ~Y) * Z, ((X * Y) + Z) * (~X + (Y * ~Z * X))]
+
+
+def test_template_matches_layout():
+    for e in FORMULAS:
+        for edge_dir in (1, -1):
+            for row in (0, 3):
+                got = proofnet._arrays_at(e, edge_dir, row, None)
+                want = proofnet.formula_arrays(e, edge_dir, row)
+                assert [list(a) for a in got[:-1]] == list(want[:-1])
+                assert got[-1] == want[-1]
+
+
+def test_atom_flags_are_kept_apart():
+    proofnet.clear_templates()
+    a = proofnet.formula_template(Var('A', atom=True), 1)
+    b = proofnet.formula_template(Var('A'), 1)
+    assert a[4][0].atom and not b[4][0].atom